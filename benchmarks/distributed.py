@@ -0,0 +1,26 @@
+import os
+
+from mlagents.distributed import train_distributed
+
+ACTORS = [1, 2, 4, 8, 16, 32]
+DURATION = 20
+
+
+def main():
+    # one core is left to the learner
+    counts = [n for n in ACTORS if n < os.cpu_count()] or [1]
+
+    print(f'{"actors":>8} {"steps/s":>12} {"speedup":>8} {"efficiency":>10} {"updates/s":>10}')
+    base = None
+    for n in counts:
+        summary = train_distributed(n, duration=DURATION, checkpoint=None, verbose=False)
+        rate = summary['steps'] / summary['seconds']
+        base = base or rate
+        print(
+            f'{n:>8} {rate:>12.0f} {rate / base:>8.2f} {rate / base / n:>10.2f} '
+            f'{summary["updates"] / summary["seconds"]:>10.1f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
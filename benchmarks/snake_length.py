@@ -0,0 +1,58 @@
+import time
+
+from game.common import Direction, Position
+from game.snake.env import SnakeGame
+
+LENGTHS = [4, 32, 128, 320, 600]
+STEPS = 20_000
+
+
+def cycle_direction(pos: Position, w=640, h=480) -> Direction:
+    # hamiltonian cycle over the board: up the right most column, then rows serpentine
+    # (odd rows right to left, even rows left to right) over the remaining columns
+    x, y = pos.x // 20, pos.y // 20
+    right, bottom = (w - 40) // 20, (h - 40) // 20
+
+    if x == right:
+        return Direction.UP if y > 1 else Direction.LEFT
+    if y % 2 == 1:
+        return Direction.LEFT if x > 1 else Direction.DOWN
+    if x < right - 1 or y == bottom:
+        return Direction.RIGHT
+    return Direction.DOWN
+
+
+def grow(env: SnakeGame, length: int):
+    env.snake.length = length
+    while len(env.snake) < length:
+        env.step(cycle_direction(env.snake.head_pos))
+
+
+def run(length: int):
+    env = SnakeGame()
+    env.food.pos = Position(0, 0)  # on the wall, never eaten
+    grow(env, length)
+
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        env.frame_cnt = 0
+        env.step(cycle_direction(env.snake.head_pos))
+    step_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        env.get_state()
+    state_time = time.perf_counter() - start
+
+    return STEPS / step_time, STEPS / state_time
+
+
+def main():
+    print(f'{"length":>8} {"step/s":>12} {"get_state/s":>12}')
+    for length in LENGTHS:
+        steps, states = run(length)
+        print(f'{length:>8} {steps:>12.0f} {states:>12.0f}')
+
+
+if __name__ == '__main__':
+    main()
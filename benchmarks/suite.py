@@ -0,0 +1,269 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import numpy as np
+
+from benchmarks.snake_length import LENGTHS, cycle_direction, grow
+from game.common import Direction, Position
+from game.snake.env import SnakeGame
+from game.snake.game_objects import Snake
+from mlagents.agent import Agent, MAX_MEMORY, BATCH_SIZE
+from mlagents.model import DenseQNet
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# every case is timed in SAMPLES runs of a batch of calls sized to take about SAMPLE_TIME seconds
+SAMPLES = 20
+SAMPLE_TIME = 0.02
+TOLERANCE = 0.2
+
+# timings are only compared against a baseline recorded on a host that matches on all of these
+HOST_KEYS = ('system', 'machine', 'cpu', 'cpus', 'python', 'numpy')
+
+
+def measure(fn):
+    # calls per batch from a short calibration run, then per call times of every batch
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= SAMPLE_TIME / 4:
+            break
+        number *= 4
+    number = max(1, int(number * SAMPLE_TIME / elapsed))
+
+    times = []
+    for _ in range(SAMPLES):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+
+    times = np.array(times) * 1e6
+    return {
+        'ops_per_sec': float(1e6 / np.median(times)),
+        'p50_us': float(np.percentile(times, 50)),
+        'p90_us': float(np.percentile(times, 90)),
+        'p99_us': float(np.percentile(times, 99)),
+        'calls': number * SAMPLES
+    }
+
+
+def cpu_model():
+    # platform.processor() is empty on most linux systems, /proc/cpuinfo has the model name
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def host():
+    return {
+        'system': platform.system(),
+        'machine': platform.machine(),
+        'cpu': cpu_model(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__
+    }
+
+
+def cycle_from(pos: Position):
+    # directions of one full hamiltonian cycle starting at pos, so timed loops skip cycle_direction
+    directions = []
+    start = pos
+    while True:
+        direction = cycle_direction(pos)
+        directions.append(direction)
+        dx, dy = Snake._OFFSETS[direction.value - 1]
+        pos = Position(pos.x + dx, pos.y + dy)
+        if pos == start:
+            return directions
+
+
+def grown_env(length):
+    env = SnakeGame(seed=0)
+    env.food.pos = Position(0, 0)  # on the wall, never eaten
+    grow(env, length)
+    return env
+
+
+def env_step(length):
+    env = grown_env(length)
+    directions = cycle_from(env.snake.head_pos)
+    i = 0
+
+    def step():
+        nonlocal i
+        env.frame_cnt = 0
+        env.step(directions[i])
+        i = (i + 1) % len(directions)
+
+    return step
+
+
+def snake_move():
+    snake = Snake((640, 480))
+    directions = cycle_from(snake.head_pos)
+    i = 0
+
+    def move():
+        nonlocal i
+        snake.move(directions[i])
+        i = (i + 1) % len(directions)
+
+    return move
+
+
+def random_transitions(rng, n):
+    return (
+        rng.integers(0, 2, (n, 11), dtype=np.uint8), rng.integers(0, 3, n),
+        rng.choice([-10.0, 0.0, 10.0], n).astype(np.float32), rng.integers(0, 2, (n, 11), dtype=np.uint8),
+        rng.random(n) < 0.1
+    )
+
+
+def net_predict(batch):
+    net = DenseQNet(lr=0.001, max_batch=BATCH_SIZE)
+    states = np.random.default_rng(0).integers(0, 2, (batch, 11), dtype=np.uint8)
+    return lambda: net.predict(states)
+
+
+def model_train_step(batch):
+    net = DenseQNet(lr=0.001, max_batch=BATCH_SIZE)
+    transitions = random_transitions(np.random.default_rng(0), batch)
+    return lambda: net.train_step(*transitions)
+
+
+def experience_replay(prioritized):
+    # replay from a full memory
+    agent = Agent(prioritized=prioritized)
+    agent.memory.extend(*random_transitions(np.random.default_rng(0), MAX_MEMORY))
+    return agent.experience_replay
+
+
+def net_save(filename, binary):
+    net = DenseQNet(lr=0.001, max_batch=BATCH_SIZE)
+    return lambda: net.save(filename, binary)
+
+
+def net_load(filename, binary):
+    net = DenseQNet(lr=0.001, max_batch=BATCH_SIZE)
+    net.save(filename, binary)
+    return lambda: net.load(filename)
+
+
+def cases(tmp):
+    # (name, setup) pairs, setup builds the case and returns the function to time,
+    # so cases left out by -k are never built
+    result = []
+
+    for length in LENGTHS:
+        result.append((f'env.step[len={length}]', lambda length=length: env_step(length)))
+        result.append((f'env.get_state[len={length}]', lambda length=length: grown_env(length).get_state))
+    result.append(('snake.move', snake_move))
+
+    action = Agent.ACTIONS[1]
+    result.append(('agent.action_to_dir', lambda: lambda: Agent.action_to_dir(Direction.UP, action)))
+
+    for batch in (1, 32, BATCH_SIZE):
+        result.append((f'net.predict[batch={batch}]', lambda batch=batch: net_predict(batch)))
+
+    for batch in (1, BATCH_SIZE):
+        result.append((f'model.train_step[batch={batch}]', lambda batch=batch: model_train_step(batch)))
+
+    result.append(('agent.experience_replay', lambda: experience_replay(False)))
+    result.append(('agent.experience_replay[prioritized]', lambda: experience_replay(True)))
+
+    for binary in (False, True):
+        suffix = '[binary]' if binary else ''
+        filename = os.path.join(tmp, 'model.npnn' if binary else 'model.pkl')
+        result.append(('net.save' + suffix, lambda filename=filename, binary=binary: net_save(filename, binary)))
+        result.append(('net.load' + suffix, lambda filename=filename, binary=binary: net_load(filename, binary)))
+
+    return result
+
+
+def compare(results, baseline, tolerance):
+    # names of the cases slower than the baseline by more than tolerance
+    regressions = []
+    for name, result in results.items():
+        if name in baseline:
+            ratio = result['ops_per_sec'] / baseline[name]['ops_per_sec']
+            result['vs_baseline'] = ratio
+            if ratio < 1 - tolerance:
+                regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='times the hot paths and compares them against a baseline')
+    parser.add_argument('-o', '--output', default='benchmark.json', help='json file with the results')
+    parser.add_argument('-b', '--baseline', default=BASELINE, help='json file of an earlier run to compare against')
+    parser.add_argument('-t', '--tolerance', type=float, default=TOLERANCE, help='allowed slowdown as a fraction')
+    parser.add_argument('-k', '--filter', default='', help='only run cases whose name contains this')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--force', action='store_true', help='compare even against a baseline of another host')
+    args = parser.parse_args(argv)
+
+    current = host()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            recorded = json.load(f)
+
+        # numbers from other hardware or library versions would report false regressions or hide real ones
+        meta = recorded.get('meta', {})
+        differences = [key for key in HOST_KEYS if meta.get(key) != current[key]]
+        if differences and not args.force:
+            print(
+                f'warning: {args.baseline} was recorded on another host ('
+                + ', '.join(f'{key}: {meta.get(key)} vs {current[key]}' for key in differences)
+                + '), not comparing (--force compares anyway, --save-baseline records one for this host)'
+            )
+        else:
+            baseline = recorded['results']
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, setup in cases(tmp):
+            if args.filter not in name:
+                continue
+
+            results[name] = result = measure(setup())
+            ratio = result['ops_per_sec'] / baseline[name]['ops_per_sec'] if name in baseline else None
+            print(
+                f'{name:<40} {result["ops_per_sec"]:>12.0f} ops/s {result["p50_us"]:>10.1f} us p50 '
+                f'{result["p99_us"]:>10.1f} us p99' + (f' {ratio:>6.2f}x' if ratio is not None else '')
+            )
+
+    regressions = compare(results, baseline, args.tolerance)
+
+    report = {
+        'meta': {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), **current},
+        'results': results,
+        'regressions': regressions
+    }
+
+    with open(args.baseline if args.save_baseline else args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if regressions:
+        print(f'{len(regressions)} regression(s) beyond {args.tolerance:.0%}: ' + ', '.join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,12 @@
+from enum import Enum
+from collections import namedtuple
+
+
+class Direction(Enum):
+	UP = 1
+	LEFT = 2
+	DOWN = 3
+	RIGHT = 4
+
+
+Position = namedtuple('Position', ['x', 'y'])
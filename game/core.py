@@ -1,23 +1,13 @@
 import pygame
-from enum import Enum
 from typing import Tuple, List
-from collections import namedtuple
+
+from game.common import Direction, Position
 
 pygame.init()
 pygame.font.init()
 pygame.mixer.init()
 
 
-class Direction(Enum):
-	UP = 1
-	LEFT = 2
-	DOWN = 3
-	RIGHT = 4
-
-
-Position = namedtuple('Position', ['x', 'y'])
-
-
 class GameObject:
 	@staticmethod
 	def load_sprite(path: str, size: Tuple[int, int]):
@@ -66,12 +56,25 @@ class MenuButton:
 		self.btn_x, self.btn_y = self.text_x - 15, self.text_y - 4
 
 		btn_w, btn_h = self.text.get_width() + 30, self.text.get_height() + 8
-		self.btn = pygame.Surface((btn_w, btn_h), pygame.SRCALPHA)
-		self.btn_region = self.btn.get_rect(topleft=(self.btn_x, self.btn_y))
+		self.btn_region = pygame.Rect(self.btn_x, self.btn_y, btn_w, btn_h)
+
+		# normal and hover looks drawn once, indexed by the hover state
+		self.btns = []
+		for outline in (self.btn_outline, self.btn_hover_outline):
+			btn = pygame.Surface((btn_w, btn_h), pygame.SRCALPHA)
+			pygame.draw.rect(btn, self.btn_color, btn.get_rect(), border_radius=50)
+			pygame.draw.rect(btn, outline, btn.get_rect(), 5, border_radius=50)
+			self.btns.append(btn)
+
+		# everything either look covers, restored from the menu layer before the button is drawn again
+		self.area = self.btn_region.unionall([
+			self.btn_region.move(self.offset, 0),
+			self.shadow.get_rect(topleft=(self.text_x + self.offset + 5, self.text_y + 2))
+		])
 
 		self.hovered = False
 
-	def render(self, display: pygame.Surface, mouse_pos: Tuple[int, int], clicked=False):
+	def hover(self, mouse_pos: Tuple[int, int], clicked=False):
 		hover = self.btn_region.collidepoint(mouse_pos)
 		selected = False
 
@@ -80,25 +83,23 @@ class MenuButton:
 			MenuButton._AUDIO_CHANNEL.set_volume(0.2)
 			MenuButton._AUDIO_CHANNEL.play(MenuButton._HOVER_SOUND)
 
-		offset = 0
-		outline = self.btn_outline
-
-		if hover:
-			if clicked:
-				MenuButton._AUDIO_CHANNEL.play(MenuButton._CLICK_SOUND)
-				selected = True
+		if hover and clicked:
+			MenuButton._AUDIO_CHANNEL.play(MenuButton._CLICK_SOUND)
+			selected = True
 
-			offset = self.offset
-			outline = self.btn_hover_outline
+		return selected
 
-		pygame.draw.rect(self.btn, self.btn_color, self.btn.get_rect(), border_radius=50)
-		pygame.draw.rect(self.btn, outline, self.btn.get_rect(), 5, border_radius=50)
+	def draw(self, display: pygame.Surface):
+		offset = self.offset if self.hovered else 0
 
-		display.blit(self.btn, (self.btn_x + offset, self.btn_y))
+		display.blit(self.btns[self.hovered], (self.btn_x + offset, self.btn_y))
 
-		if hover: display.blit(self.shadow, (self.text_x + offset + 5, self.text_y + 2))
+		if self.hovered: display.blit(self.shadow, (self.text_x + offset + 5, self.text_y + 2))
 		display.blit(self.text, (self.text_x + offset, self.text_y))
 
+	def render(self, display: pygame.Surface, mouse_pos: Tuple[int, int], clicked=False):
+		selected = self.hover(mouse_pos, clicked)
+		self.draw(display)
 		return selected
 
 
@@ -118,13 +119,45 @@ class Menu:
 
 		self.menu: List[MenuButton] = []
 
-	def render(self, display: pygame.Surface, mouse_pos: Tuple[int, int], clicked: bool):
+		# the frame under the buttons (whatever was on the display, then the overlay and title), copied
+		# the first time the menu is drawn, and the display areas changed by the last render
+		self.layer: pygame.Surface = None
+		self.rects: List[pygame.Rect] = []
+
+	def invalidate(self):
+		# the display changed under the menu, the next render composes the layer again
+		self.layer = None
+
+	def render_layer(self, display: pygame.Surface):
 		display.blit(self.shadow, self.shadow_pos)
 		display.blit(self.title, self.title_pos)
 
+	def render(self, display: pygame.Surface, mouse_pos: Tuple[int, int], clicked: bool):
+		# once the layer is cached, a frame only draws the buttons whose hover state changed,
+		# the display is left untouched while the mouse stays over the same button
+		self.rects = []
+
+		full = self.layer is None
+		if full:
+			self.render_layer(display)
+			self.layer = display.copy()
+			self.rects.append(display.get_rect())
+
 		selected = None
 		for index, btn in enumerate(self.menu):
-			if btn.render(display, mouse_pos, clicked):
+			hovered = btn.hovered
+			if btn.hover(mouse_pos, clicked):
 				selected = index
 
+			if full:
+				btn.draw(display)
+			elif btn.hovered != hovered:
+				display.blit(self.layer, btn.area, btn.area)
+				btn.draw(display)
+				self.rects.append(btn.area)
+
+		# a selection closes the menu, it is composed again over whatever is shown when it opens next
+		if selected is not None:
+			self.invalidate()
+
 		return selected
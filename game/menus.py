@@ -51,9 +51,9 @@ class PauseMenu(Menu):
 			PauseMenu.MenuItem('Quit', (320, 374))
 		]
 
-	def render(self, display: pygame.Surface, mouse_pos: Tuple[int, int], clicked: bool):
+	def render_layer(self, display: pygame.Surface):
 		display.blit(PauseMenu.OVERLAY, (0, 0))
-		return super(PauseMenu, self).render(display, mouse_pos, clicked)
+		super(PauseMenu, self).render_layer(display)
 
 
 class GameOverMenu(Menu):
@@ -88,12 +88,19 @@ class GameOverMenu(Menu):
 
 		self.score = None
 		self.score_pos = None
+		self.score_value = None
 
 	def set_score(self, score: int):
+		# the score is part of the cached layer, which is composed again only for a new score
+		if score == self.score_value:
+			return
+
+		self.score_value = score
 		self.score = GameOverMenu._SCORE_FONT.render(f'Score: {score}', True, (255, 162, 156))
 		self.score_pos = self.score.get_rect(center=(320, 160))
+		self.invalidate()
 
-	def render(self, display: pygame.Surface, mouse_pos: Tuple[int, int], clicked: bool):
+	def render_layer(self, display: pygame.Surface):
 		display.blit(PauseMenu.OVERLAY, (0, 0))
 		display.blit(self.score, self.score_pos)
-		return super(GameOverMenu, self).render(display, mouse_pos, clicked)
+		super(GameOverMenu, self).render_layer(display)
@@ -3,14 +3,17 @@ from sys import exit
 from time import sleep
 
 from mlagents.agent import Agent
+from mlagents.profiling import profiler
 from game.snake.env import SnakeGame
+from game.snake.audio import SnakeAudio
+from game.snake.render import SnakeRenderer
 
 from game.core import Direction, GameObject
 from game.menus import MainMenu, PauseMenu, GameOverMenu
 
 
 def loading_screen(display: pygame.Surface, env: SnakeGame):
-	SnakeGame.play_bgm()
+	SnakeAudio.play_bgm()
 
 	font = pygame.font.Font('assets/fonts/RockSalt-Regular.ttf', 40)
 	font.bold = True
@@ -40,6 +43,7 @@ def loading_screen(display: pygame.Surface, env: SnakeGame):
 		display.blit(text_shadow, text_shadow.get_rect(center=(330, 242)))
 		display.blit(text, text.get_rect(center=(320, 240)))
 
+		env.renderer.invalidate()
 		pygame.display.flip()
 
 		if seconds_left == 0:
@@ -49,7 +53,7 @@ def loading_screen(display: pygame.Surface, env: SnakeGame):
 
 
 def play_the_game(display: pygame.Surface):
-	env = SnakeGame(display)
+	env = SnakeGame(display.get_size(), SnakeRenderer(display), SnakeAudio())
 	loading_screen(display, env)
 
 	pause_menu = PauseMenu()
@@ -64,7 +68,7 @@ def play_the_game(display: pygame.Surface):
 
 	while True:
 		clicked = False
-		direction = env.snake.head.direction
+		direction = env.snake.direction
 
 		for event in pygame.event.get():
 			if event.type == pygame.QUIT:
@@ -92,7 +96,8 @@ def play_the_game(display: pygame.Surface):
 		if not game_paused and not game_over:
 			_, game_over, _ = env.step(direction)
 
-		env.render()
+		rects = env.render()
+		menu_closed = False
 
 		mouse_pos = pygame.mouse.get_pos()
 
@@ -101,12 +106,18 @@ def play_the_game(display: pygame.Surface):
 				PauseMenu.play_bgm()
 				bgm_played = True
 
+			# the board changed under the menu, so its layer is composed again
+			if rects:
+				pause_menu.invalidate()
+
 			selected = pause_menu.render(display, mouse_pos, clicked)
+			rects += pause_menu.rects
 			if selected is not None:
 				bgm_played = game_paused = False
+				menu_closed = True
 
 				if selected == 0:
-					SnakeGame.play_bgm()
+					SnakeAudio.play_bgm()
 
 				elif selected == 1:
 					env.reset()
@@ -128,9 +139,14 @@ def play_the_game(display: pygame.Surface):
 					GameOverMenu.play_game_over()
 					bgm_played = True
 
+				if rects:
+					game_over_menu.invalidate()
+
 				selected = game_over_menu.render(display, mouse_pos, clicked)
+				rects += game_over_menu.rects
 				if selected is not None:
 					bgm_played = game_over = False
+					menu_closed = True
 					game_over_time = 5
 
 					if selected == 0:
@@ -146,12 +162,15 @@ def play_the_game(display: pygame.Surface):
 			else:
 				game_over_time -= 1
 
-		pygame.display.flip()
+		# a closed menu leaves its overlay on the display, so the next frame redraws the board from scratch
+		if menu_closed:
+			env.renderer.invalidate()
+		pygame.display.update(rects)
 		clock.tick(20)
 
 
 def watch_agent_play(display: pygame.Surface):
-	env = SnakeGame(display)
+	env = SnakeGame(display.get_size(), SnakeRenderer(display), SnakeAudio())
 	agent = Agent(model='assets/snake_agent.pkl')
 
 	loading_screen(display, env)
@@ -180,23 +199,35 @@ def watch_agent_play(display: pygame.Surface):
 					game_paused = True
 
 		if not game_paused:
-			state = env.get_state()
-			action = agent.predict_action(state)
-			_, game_over, _ = env.step(Agent.action_to_dir(env.snake.head.direction, action))
-
-		env.render()
+			with profiler.timer('get_state'):
+				state = env.get_state()
+			with profiler.timer('get_action'):
+				action = agent.predict_action(state)
+			with profiler.timer('env.step'):
+				_, game_over, _ = env.step(Agent.action_to_dir(env.snake.direction, action))
+			profiler.step()
+
+		with profiler.timer('render'):
+			rects = env.render()
+		menu_closed = False
 
 		if game_paused:
 			if not bgm_played:
 				PauseMenu.play_bgm()
 				bgm_played = True
 
+			# the board changed under the menu, so its layer is composed again
+			if rects:
+				pause.invalidate()
+
 			selected = pause.render(display, pygame.mouse.get_pos(), clicked)
+			rects += pause.rects
 			if selected is not None:
 				bgm_played = game_paused = False
+				menu_closed = True
 
 				if selected == 0:
-					SnakeGame.play_bgm()
+					SnakeAudio.play_bgm()
 
 				elif selected == 1:
 					env.reset()
@@ -209,13 +240,19 @@ def watch_agent_play(display: pygame.Surface):
 					pygame.display.quit()
 					exit(0)
 
-		pygame.display.flip()
+		# a closed menu leaves its overlay on the display, so the next frame redraws the board from scratch
+		if menu_closed:
+			env.renderer.invalidate()
+		with profiler.timer('display.update'):
+			pygame.display.update(rects)
 
 		if game_over:
+			profiler.game_over()
 			sleep(1)
 			env.reset()
 
-		clock.tick(25)
+		with profiler.timer('clock.tick'):
+			clock.tick(25)
 
 
 def main_screen(display: pygame.Surface):
@@ -230,6 +267,9 @@ def main_screen(display: pygame.Surface):
 	MainMenu.play_bgm()
 	clock = pygame.time.Clock()
 
+	# the menu keeps the background it was composed over, so it is drawn again only after a screen returns
+	redraw = True
+
 	while True:
 		clicked = False
 
@@ -243,10 +283,14 @@ def main_screen(display: pygame.Surface):
 				event.button == pygame.BUTTON_LEFT
 			)
 
-		display.blit(background, (0, 0))
+		if redraw:
+			display.blit(background, (0, 0))
+			redraw = False
 
 		selected = menu.render(display, pygame.mouse.get_pos(), clicked)
 		if selected is not None:
+			redraw = True
+
 			if selected == 0:
 				play_the_game(display)
 
@@ -257,5 +301,5 @@ def main_screen(display: pygame.Surface):
 				pygame.quit()
 				exit(0)
 
-		pygame.display.flip()
+		pygame.display.update(menu.rects)
 		clock.tick(60)
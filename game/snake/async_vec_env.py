@@ -0,0 +1,142 @@
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Tuple
+
+from game.common import Direction
+from game.snake.env import SnakeGame
+
+# columns of the shared array, one row per game: state features, then the step results and the worker's next action
+STATE_SIZE = 11
+REWARD, DONE, SCORE, ACTION = range(STATE_SIZE, STATE_SIZE + 4)
+COLUMNS = STATE_SIZE + 4
+
+# clockwise order, same as Agent.action_to_dir, and action index -> turn (straight, right, left)
+_CLOCKWISE = (Direction.RIGHT, Direction.DOWN, Direction.LEFT, Direction.UP)
+_TURNS = (0, 1, -1)
+
+
+def _work(conn, name, n_envs, lo, hi, win_size, seed):
+	# worker process: owns games lo..hi and only touches their rows of the shared array
+	shm = shared_memory.SharedMemory(name=name)
+	rows = np.ndarray((n_envs, COLUMNS), dtype=np.int64, buffer=shm.buf)[lo:hi]
+	games = [SnakeGame(win_size, seed=None if seed is None else seed + i) for i in range(lo, hi)]
+
+	try:
+		while True:
+			cmd = conn.recv_bytes()
+			if cmd == b'close':
+				break
+
+			for row, game in zip(rows, games):
+				if cmd == b'reset':
+					game.reset()
+				elif cmd == b'step':
+					turn = _TURNS[row[ACTION]]
+					direction = _CLOCKWISE[(_CLOCKWISE.index(game.snake.direction) + turn) % 4]
+					row[REWARD], row[DONE], row[SCORE] = game.step(direction)
+
+					# finished games restart right away, like VecSnakeGame
+					if row[DONE]:
+						game.reset()
+
+				game.get_state(row[:STATE_SIZE])
+
+			conn.send_bytes(b'')
+
+	except KeyboardInterrupt:
+		pass
+
+	finally:
+		del rows
+		shm.close()
+
+
+class AsyncVecEnv:
+	# n_envs SnakeGame instances spread over worker processes, with the same interface as VecSnakeGame
+	# step_async returns right away, so the caller can work while the workers simulate, step_wait collects the results
+	def __init__(self, n_envs: int, n_workers: int = None, win_size: Tuple[int, int] = (640, 480), seed: int = None):
+		self.n_envs = n_envs
+		self.n_workers = min(n_workers or mp.cpu_count(), n_envs)
+		self.waiting = False
+
+		self.shm = shared_memory.SharedMemory(create=True, size=n_envs * COLUMNS * 8)
+		self.buffer = np.ndarray((n_envs, COLUMNS), dtype=np.int64, buffer=self.shm.buf)
+		self.buffer.fill(0)
+
+		bounds = np.linspace(0, n_envs, self.n_workers + 1).astype(int)
+		self.conns = []
+		self.workers = []
+		for lo, hi in zip(bounds[:-1], bounds[1:]):
+			conn, child = mp.Pipe()
+			worker = mp.Process(
+				target=_work, args=(child, self.shm.name, n_envs, lo, hi, win_size, seed), daemon=True
+			)
+			worker.start()
+			child.close()
+
+			self.conns.append(conn)
+			self.workers.append(worker)
+
+		# fresh games, only their states are needed
+		self._send(b'state')
+		self._wait()
+
+	def _send(self, cmd: bytes):
+		for conn in self.conns:
+			conn.send_bytes(cmd)
+
+	def _wait(self):
+		for conn in self.conns:
+			conn.recv_bytes()
+
+	def reset(self):
+		self._send(b'reset')
+		self._wait()
+
+	def step_async(self, actions):
+		actions = np.asarray(actions)
+		if actions.ndim == 2:
+			actions = actions.argmax(axis=1)
+
+		self.buffer[:, ACTION] = actions
+		self._send(b'step')
+		self.waiting = True
+
+	def step_wait(self):
+		self._wait()
+		self.waiting = False
+
+		return self.buffer[:, REWARD].copy(), self.buffer[:, DONE].astype(bool), self.buffer[:, SCORE].copy()
+
+	def step(self, actions):
+		self.step_async(actions)
+		return self.step_wait()
+
+	def get_state(self) -> np.ndarray:
+		return self.buffer[:, :STATE_SIZE].copy()
+
+	def close(self):
+		if self.buffer is None:
+			return
+
+		# on Ctrl-C the workers got the interrupt as well and may have exited already, their pipes are closed then
+		for conn in self.conns:
+			try:
+				if self.waiting:
+					conn.recv_bytes()
+				conn.send_bytes(b'close')
+			except (EOFError, OSError):
+				pass
+			conn.close()
+
+		for worker in self.workers:
+			worker.join(5)
+			if worker.is_alive():
+				worker.terminate()
+				worker.join()
+
+		self.waiting = False
+		self.buffer = None
+		self.shm.close()
+		self.shm.unlink()
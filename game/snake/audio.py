@@ -0,0 +1,31 @@
+import pygame
+
+
+class SnakeAudio:
+	_COLLISION_SOUND: pygame.mixer.Sound = None
+	_FOOD_CRUNCH_SOUND: pygame.mixer.Sound = None
+
+	@staticmethod
+	def _load_assets():
+		if SnakeAudio._COLLISION_SOUND is not None:
+			return
+
+		pygame.mixer.init()
+		SnakeAudio._COLLISION_SOUND = pygame.mixer.Sound('assets/sfx/collision.mp3')
+		SnakeAudio._FOOD_CRUNCH_SOUND = pygame.mixer.Sound('assets/sfx/apple_bite.mp3')
+
+	@staticmethod
+	def play_bgm():
+		pygame.mixer.init()
+		pygame.mixer.music.load('assets/sfx/main_bgm.mp3')
+		pygame.mixer.music.set_volume(0.5)
+		pygame.mixer.music.play(-1)
+
+	def __init__(self):
+		SnakeAudio._load_assets()
+
+	def collision(self):
+		SnakeAudio._COLLISION_SOUND.play()
+
+	def food_crunch(self):
+		SnakeAudio._FOOD_CRUNCH_SOUND.play()
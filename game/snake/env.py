@@ -1,33 +1,26 @@
-import pygame
 import numpy as np
+from random import Random
+from typing import Tuple
 
-from game.core import Direction, Position
+from game.common import Direction
 from game.snake.game_objects import Snake, Food
 
-pygame.init()
-pygame.font.init()
-pygame.mixer.init()
-
 
 class SnakeGame:
-	_COLLISION_SOUND = pygame.mixer.Sound('assets/sfx/collision.mp3')
-	_FOOD_CRUNCH_SOUND = pygame.mixer.Sound('assets/sfx/apple_bite.mp3')
-
-	_FONT = pygame.font.SysFont('arial', 18)
-	_OPTIONS_TEXT = _FONT.render('ESC: MENU', True, (255, 255, 255))
+	# the game logic never touches pygame, rendering and audio are optional attachments
+	# (game.snake.render.SnakeRenderer and game.snake.audio.SnakeAudio)
 
-	@staticmethod
-	def play_bgm():
-		pygame.mixer.music.load('assets/sfx/main_bgm.mp3')
-		pygame.mixer.music.set_volume(0.5)
-		pygame.mixer.music.play(-1)
+	# move direction features (left, right, up, down) per direction id
+	_DIRECTION_FEATURES = np.array([[0, 0, 1, 0], [1, 0, 0, 0], [0, 0, 0, 1], [0, 1, 0, 0]], dtype=np.uint8)
 
-	def __init__(self, display: pygame.Surface):
-		self.display = display
-		self.win_size = display.get_size()
+	def __init__(self, win_size: Tuple[int, int] = (640, 480), renderer=None, audio=None, seed: int = None):
+		self.win_size = win_size
+		self.renderer = renderer
+		self.audio = audio
+		self.rng = Random(seed)
 
 		self.snake = Snake(self.win_size)
-		self.food = Food(self.win_size)
+		self.food = Food(self.win_size, self.rng, self.snake.free_cells)
 		self.score = self.frame_cnt = self.record = 0
 
 	def reset(self):
@@ -36,7 +29,7 @@ class SnakeGame:
 
 		self.score = self.frame_cnt = 0
 		self.snake = Snake(self.win_size)
-		self.food = Food(self.win_size)
+		self.food = Food(self.win_size, self.rng, self.snake.free_cells)
 
 	def step(self, direction: Direction):
 		self.frame_cnt += 1
@@ -46,82 +39,63 @@ class SnakeGame:
 		reward = 0
 		game_over = False
 
-		if self.snake.has_collision() or self.frame_cnt > 100 * len(self.snake.body):
-			SnakeGame._COLLISION_SOUND.play()
+		if self.snake.has_collision() or self.frame_cnt > 100 * len(self.snake):
+			if self.audio is not None:
+				self.audio.collision()
+
 			game_over = True
 			reward = -10
 			return reward, game_over, self.score
 
 		if self.snake.ate(self.food):
-			SnakeGame._FOOD_CRUNCH_SOUND.play()
+			if self.audio is not None:
+				self.audio.food_crunch()
+
 			self.score += 1
 			reward = 10
 
 			self.snake.length += 1
-			while True:
-				self.food.pos = self.food.create_new()
-				if not self.snake.on_body(self.food):
-					break
 
-		return reward, game_over, self.score
+			# no cell left for the food, the board is cleared
+			if len(self.snake.free_cells) == 0:
+				game_over = True
+				return reward, game_over, self.score
 
-	def render(self):
-		self.display.fill((207, 237, 154))
-		pygame.draw.rect(self.display, (130, 82, 0), pygame.Rect(0, 0, 640, 480), 40)
+			self.food.pos = self.food.create_new(self.snake.free_cells)
 
-		self.food.render(self.display)
-		self.snake.render(self.display)
+		return reward, game_over, self.score
+
+	def render(self) -> list:
+		# the display areas drawn this frame, for pygame.display.update
+		if self.renderer is None:
+			return []
+		return self.renderer.render(self)
 
-		score_text = SnakeGame._FONT.render(f'Score: {self.score}', True, (255, 255, 255))
-		record_text = SnakeGame._FONT.render(f'Best: {self.record}', True, (255, 255, 255))
+	def get_state(self, out: np.ndarray = None) -> np.ndarray:
+		# the 11 features written into out (any numeric dtype, e.g. a float32 row of a batch buffer) or a new int array
+		if out is None:
+			out = np.empty(11, dtype=int)
 
-		self.display.blit(score_text, score_text.get_rect(center=(250, 10)))
-		self.display.blit(record_text, record_text.get_rect(center=(390, 10)))
-		self.display.blit(SnakeGame._OPTIONS_TEXT, (0, 0))
+		snake = self.snake
+		d = snake.direction.value - 1
+		head_x, head_y = snake.head_pos
+		food_x, food_y = self.food.pos
 
-	def get_state(self):
-		head_pos = self.snake.head.pos
-		point_u = Position(head_pos.x, head_pos.y - 20)
-		point_l = Position(head_pos.x - 20, head_pos.y)
-		point_d = Position(head_pos.x, head_pos.y + 20)
-		point_r = Position(head_pos.x + 20, head_pos.y)
+		# danger ahead, right and left, one occupancy read per neighbour since walls count as occupied
+		cells = snake.cells
+		head = snake.cell(snake.head_pos)
+		ahead, right, left = snake.neighbours[d]
+		out[0] = cells[head + ahead] > 0
+		out[1] = cells[head + right] > 0
+		out[2] = cells[head + left] > 0
 
-		direction = self.snake.head.direction
-		dir_u = direction == Direction.UP
-		dir_l = direction == Direction.LEFT
-		dir_d = direction == Direction.DOWN
-		dir_r = direction == Direction.RIGHT
+		# move direction
+		out[3:7] = SnakeGame._DIRECTION_FEATURES[d]
 
-		head_x, head_y = head_pos
-		food_x, food_y = self.food.pos
+		# food location
+		out[7] = food_x < head_x  # food left
+		out[8] = food_x > head_x  # food right
+		out[9] = food_y < head_y  # food up
+		out[10] = food_y > head_y  # food down
 
-		state = [
-			# Danger ahead
-			(dir_r and self.snake.has_collision(point_r)) or
-			(dir_l and self.snake.has_collision(point_l)) or
-			(dir_u and self.snake.has_collision(point_u)) or
-			(dir_d and self.snake.has_collision(point_d)),
-
-			# Danger to right
-			(dir_u and self.snake.has_collision(point_r)) or
-			(dir_d and self.snake.has_collision(point_l)) or
-			(dir_l and self.snake.has_collision(point_u)) or
-			(dir_r and self.snake.has_collision(point_d)),
-
-			# Danger to left
-			(dir_d and self.snake.has_collision(point_r)) or
-			(dir_u and self.snake.has_collision(point_l)) or
-			(dir_r and self.snake.has_collision(point_u)) or
-			(dir_l and self.snake.has_collision(point_d)),
-
-			# Move direction
-			dir_l, dir_r, dir_u, dir_d,
-
-			# Food location
-			food_x < head_x,  # food left
-			food_x > head_x,  # food right
-			food_y < head_y,  # food up
-			food_y > head_y  # food down
-		]
-
-		return np.array(state, dtype=int)
+		return out
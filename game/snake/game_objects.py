@@ -1,161 +1,197 @@
-import pygame
+import numpy as np
+from random import Random
 from typing import Tuple
-from random import randint
-from collections import deque
 
-from game.core import GameObject, Position, Direction
+from game.common import Position, Direction
 
 
-class Food(GameObject):
-	_SPRITE = GameObject.load_sprite('assets/sprites/apple.png', (20, 20))
-
+class FreeCells:
+	# swap-remove set of the cells food can spawn on that are not covered by the snake
 	def __init__(self, win_size: Tuple[int, int]):
-		self.w, self.h = win_size
-		super().__init__(pos=self.create_new(), sprite=Food._SPRITE)
+		w, h = win_size
+		self.rows = h // 20
 
-	def create_new(self) -> Position:
-		return Position(
-			randint(2, (self.w - 40) // 20) * 20,
-			randint(2, (self.h - 40) // 20) * 20
-		)
+		xs, ys = np.meshgrid(Food.spawn_range(w), Food.spawn_range(h), indexing='ij')
+		self.cells = (xs * self.rows + ys).ravel()
+		self.size = len(self.cells)
 
+		# slot of every cell in self.cells, -1 if the cell is taken or food never spawns there
+		self.slots = np.full((w // 20) * self.rows, -1, dtype=np.int64)
+		self.slots[self.cells] = np.arange(self.size)
+		self.spawnable = self.slots >= 0
 
-class Snake:
-	# load sprites
-	body_parts = [GameObject.load_sprite(f'assets/sprites/snake-body/{i}.png', (20, 20)) for i in range(1, 15)]
+	def __len__(self):
+		return self.size
 
-	_HEAD_U, _HEAD_L, _HEAD_D, _HEAD_R = body_parts[0: 4]
-	_TAIL_U, _TAIL_L, _TAIL_D, _TAIL_R = body_parts[4: 8]
-	_TURN_UL, _TURN_UR, _TURN_DL, _TURN_DR = body_parts[8: 12]
-	_BODY_H, _BODY_V = body_parts[12: 14]
+	def remove(self, pos: Position):
+		cell = (pos.x // 20) * self.rows + pos.y // 20
+		slot = self.slots[cell]
+		if slot < 0:
+			return
 
-	del body_parts
+		self.size -= 1
+		last = self.cells[self.size]
+		self.cells[slot] = last
+		self.slots[last] = slot
+		self.slots[cell] = -1
 
-	class _BodyPart(GameObject):
-		def __init__(self, pos: Position, direction: Direction, sprite: pygame.surface.Surface):
-			self.direction = direction
-			super().__init__(pos=pos, sprite=sprite)
+	def add(self, pos: Position):
+		cell = (pos.x // 20) * self.rows + pos.y // 20
+		if not self.spawnable[cell] or self.slots[cell] >= 0:
+			return
 
-		def copy(self):
-			return Snake._BodyPart(pos=self.pos, direction=self.direction, sprite=self.sprite)
+		self.cells[self.size] = cell
+		self.slots[cell] = self.size
+		self.size += 1
 
-	def __init__(self, win_size: Tuple[int, int]):
-		self.w, self.h = win_size
+	def sample(self, rng: Random) -> Position:
+		cell = int(self.cells[rng.randrange(self.size)])
+		return Position((cell // self.rows) * 20, (cell % self.rows) * 20)
 
-		self.head = self._BodyPart(
-			pos=Position(self.w // 2, self.h // 2),
-			direction=Direction.RIGHT, sprite=Snake._HEAD_R
-		)
 
-		self.body = deque([
-			self.head,
+class Food:
+	@staticmethod
+	def spawn_range(size: int) -> range:
+		return range(2, (size - 40) // 20 + 1)
 
-			self._BodyPart(
-				pos=Position(self.head.pos.x - 20, self.head.pos.y),
-				direction=Direction.RIGHT, sprite=Snake._BODY_H
-			),
+	def __init__(self, win_size: Tuple[int, int], rng: Random = None, free_cells: FreeCells = None):
+		self.w, self.h = win_size
+		self.rng = rng if rng is not None else Random()
+		self.pos = self.create_new(free_cells)
 
-			self._BodyPart(
-				pos=Position(self.head.pos.x - 40, self.head.pos.y),
-				direction=Direction.RIGHT, sprite=Snake._BODY_H
-			),
+	def create_new(self, free_cells: FreeCells = None) -> Position:
+		if free_cells is not None:
+			return free_cells.sample(self.rng)
 
-			self._BodyPart(
-				pos=Position(self.head.pos.x - 60, self.head.pos.y),
-				direction=Direction.RIGHT, sprite=Snake._TAIL_R
-			)
-		])
+		return Position(
+			self.rng.randint(2, (self.w - 40) // 20) * 20,
+			self.rng.randint(2, (self.h - 40) // 20) * 20
+		)
 
-		self.length = 4
 
-	def move(self, direction: Direction):
-		# create a new head
-		head: Snake._BodyPart = self.head.copy()
-		head.direction = direction
-		x, y = head.pos
+class Snake:
+	# sprite ids, index into the sprite sheet loaded by the renderer (assets/sprites/snake-body/{id + 1}.png)
+	_HEAD_U, _HEAD_L, _HEAD_D, _HEAD_R = range(0, 4)
+	_TAIL_U, _TAIL_L, _TAIL_D, _TAIL_R = range(4, 8)
+	_TURN_UL, _TURN_UR, _TURN_DL, _TURN_DR = range(8, 12)
+	_BODY_H, _BODY_V = range(12, 14)
+
+	# lookup tables indexed by direction id (Direction.value - 1: up, left, down, right)
+	_DIRECTIONS = (Direction.UP, Direction.LEFT, Direction.DOWN, Direction.RIGHT)
+	_OFFSETS = ((0, -20), (-20, 0), (0, 20), (20, 0))
+
+	_HEADS = (_HEAD_U, _HEAD_L, _HEAD_D, _HEAD_R)
+	_TAILS = (_TAIL_U, _TAIL_L, _TAIL_D, _TAIL_R)
+
+	# sprite of a body part given the direction of the part in front of it and its own direction
+	_BODIES = (
+		(_BODY_V, _TURN_UL, _BODY_V, _TURN_UR),
+		(_TURN_DR, _BODY_H, _TURN_UR, _BODY_H),
+		(_BODY_V, _TURN_DL, _BODY_V, _TURN_DR),
+		(_TURN_DL, _BODY_H, _TURN_UL, _BODY_H)
+	)
+
+	# the ids go counterclockwise, so turning right is d - 1 and turning left d + 1
+	_RIGHT = (3, 0, 1, 2)
+	_LEFT = (1, 2, 3, 0)
 
-		if direction is Direction.UP:
-			head.set_sprite(Snake._HEAD_U)
-			head.pos = Position(x, y - 20)
+	def __init__(self, win_size: Tuple[int, int]):
+		self.w, self.h = win_size
 
-		elif direction is Direction.LEFT:
-			head.set_sprite(Snake._HEAD_L)
-			head.pos = Position(x - 20, y)
+		# body parts live in ring buffers, head at head_idx and the tail size - 1 slots behind it
+		self.capacity = (self.w // 20) * (self.h // 20)
+		self.xs = np.zeros(self.capacity, dtype=np.int16)
+		self.ys = np.zeros(self.capacity, dtype=np.int16)
+		self.dirs = np.zeros(self.capacity, dtype=np.uint8)
+		self.sprites = np.zeros(self.capacity, dtype=np.uint8)
+
+		# number of body parts on every 20px cell and the cells left for food, kept in sync by move()
+		# the grid has a margin of one cell on every side and the walls count as occupied, so every
+		# neighbour of a head that may have just run into a wall can be read without a bounds check
+		self.grid = np.ones((self.w // 20 + 2, self.h // 20 + 2), dtype=np.uint8)
+		self.grid[2: (self.w - 40) // 20 + 2, 2: (self.h - 40) // 20 + 2] = 0
+		self.free_cells = FreeCells(win_size)
+
+		# flat view of the grid and the offsets of the cells around a head in it, per direction id
+		self.cells = self.grid.reshape(-1)
+		self.stride = self.grid.shape[1]
+		steps = [dx // 20 * self.stride + dy // 20 for dx, dy in Snake._OFFSETS]
+		self.neighbours = [(steps[d], steps[Snake._RIGHT[d]], steps[Snake._LEFT[d]]) for d in range(4)]
+
+		x, y = self.w // 2, self.h // 2
+		right = Direction.RIGHT.value - 1
+		for i, sprite in enumerate((Snake._TAIL_R, Snake._BODY_H, Snake._BODY_H, Snake._HEAD_R)):
+			self.xs[i], self.ys[i] = x - 60 + 20 * i, y
+			self.dirs[i], self.sprites[i] = right, sprite
+			self._occupy(Position(x - 60 + 20 * i, y))
+
+		self.head_idx = 3
+		self.size = self.length = 4
+
+		self.head_pos = Position(x, y)
+		self.direction = Direction.RIGHT
+
+	def __len__(self):
+		return self.size
+
+	def cell(self, pos: Position) -> int:
+		# index of the cell under pos in self.cells
+		return (pos.x // 20 + 1) * self.stride + pos.y // 20 + 1
+
+	def _occupy(self, pos: Position):
+		self.cells[self.cell(pos)] += 1
+		self.free_cells.remove(pos)
+
+	def _vacate(self, pos: Position):
+		cell = self.cell(pos)
+		self.cells[cell] -= 1
+		if self.cells[cell] == 0:
+			self.free_cells.add(pos)
 
-		elif direction is Direction.DOWN:
-			head.set_sprite(Snake._HEAD_D)
-			head.pos = Position(x, y + 20)
+	def move(self, direction: Direction):
+		d = direction.value - 1
+		dx, dy = Snake._OFFSETS[d]
+		self.head_pos = Position(self.head_pos.x + dx, self.head_pos.y + dy)
+		self.direction = direction
+
+		# push the new head, the old head becomes the neck
+		neck = self.head_idx
+		self.head_idx = head = (neck + 1) % self.capacity
+		self.xs[head], self.ys[head] = self.head_pos
+		self.dirs[head], self.sprites[head] = d, Snake._HEADS[d]
+		self.sprites[neck] = Snake._BODIES[d][self.dirs[neck]]
+		self.size += 1
+		self._occupy(self.head_pos)
 
-		else:
-			head.set_sprite(Snake._HEAD_R)
-			head.pos = Position(x + 20, y)
+		# remove the last body part if greater than length
+		tail = (head - self.size + 1) % self.capacity
+		if self.size > self.length:
+			self._vacate(Position(int(self.xs[tail]), int(self.ys[tail])))
+			self.size -= 1
+			tail = (tail + 1) % self.capacity
 
-		# append the new head and change the head pointer
-		self.body.appendleft(head)
-		self.head = head
+		# correct tail sprite, only the tail and the neck can change on a move
+		self.sprites[tail] = Snake._TAILS[self.dirs[(tail + 1) % self.capacity]]
 
-		# remove the last body part if greater than length
-		if len(self.body) > self.length:
-			self.body.pop()
-
-		# correct the sprites of the body parts (excluding the tail)
-		for i in range(1, len(self.body) - 1):
-			body_part = self.body[i]
-			prev_body_part = self.body[i - 1]
-
-			if prev_body_part.direction is Direction.UP:
-				if body_part.direction is Direction.RIGHT: body_part.set_sprite(Snake._TURN_UR)
-				elif body_part.direction is Direction.LEFT: body_part.set_sprite(Snake._TURN_UL)
-				else: body_part.set_sprite(Snake._BODY_V)
-
-			elif prev_body_part.direction is Direction.LEFT:
-				if body_part.direction is Direction.UP: body_part.set_sprite(Snake._TURN_DR)
-				elif body_part.direction is Direction.DOWN: body_part.set_sprite(Snake._TURN_UR)
-				else: body_part.set_sprite(Snake._BODY_H)
-
-			elif prev_body_part.direction is Direction.DOWN:
-				if body_part.direction is Direction.RIGHT: body_part.set_sprite(Snake._TURN_DR)
-				elif body_part.direction is Direction.LEFT: body_part.set_sprite(Snake._TURN_DL)
-				else: body_part.set_sprite(Snake._BODY_V)
-
-			else:
-				if body_part.direction is Direction.UP: body_part.set_sprite(Snake._TURN_DL)
-				elif body_part.direction is Direction.DOWN: body_part.set_sprite(Snake._TURN_UL)
-				else: body_part.set_sprite(Snake._BODY_H)
-
-		# correct tail sprite
-		tail = self.body[-1]
-		prev_body_part = self.body[-2]
-
-		if prev_body_part.direction is Direction.UP: tail.set_sprite(Snake._TAIL_U)
-		elif prev_body_part.direction is Direction.LEFT: tail.set_sprite(Snake._TAIL_L)
-		elif prev_body_part.direction is Direction.DOWN: tail.set_sprite(Snake._TAIL_D)
-		else: tail.set_sprite(Snake._TAIL_R)
+	def parts(self):
+		# positions and sprite ids from the tail to the head
+		idx = (np.arange(self.head_idx - self.size + 1, self.head_idx + 1)) % self.capacity
+		return self.xs[idx], self.ys[idx], self.sprites[idx]
 
 	def ate(self, food: Food):
-		return self.head.pos == food.pos
+		return self.head_pos == food.pos
 
 	def has_collision(self, pos: Position = None):
-		head_pos = self.head.pos
+		head_pos = self.head_pos
 		if pos is not None:
 			head_pos = pos
 
 		if head_pos.x < 20 or head_pos.x > (self.w - 40) or head_pos.y < 20 or head_pos.y > (self.h - 40):
 			return True
 
-		for i in range(1, len(self.body)):
-			if head_pos == self.body[i].pos:
-				return True
-
-		return False
+		# the head itself is on the grid, so it only collides if another part shares its cell
+		own = 1 if head_pos == self.head_pos else 0
+		return self.cells[self.cell(head_pos)] > own
 
 	def on_body(self, food: Food):
-		for body_part in self.body:
-			if body_part.pos == food.pos:
-				return True
-
-		return False
-
-	def render(self, display: pygame.surface.Surface):
-		for body_part in reversed(self.body):
-			body_part.render(display)
+		return self.cells[self.cell(food.pos)] > 0
@@ -0,0 +1,153 @@
+import pygame
+import numpy as np
+from typing import List, Tuple
+
+
+def _load_sprite(path: str, size: Tuple[int, int]) -> pygame.Surface:
+	sprite = pygame.image.load(path)
+	return pygame.transform.smoothscale(sprite, size)
+
+
+class SnakeRenderer:
+	# assets are loaded by the first renderer, so importing this module touches no pygame subsystem
+	_FONT: pygame.font.Font = None
+	_OPTIONS_TEXT: pygame.Surface = None
+
+	_FOOD_SPRITE: pygame.Surface = None
+	_BODY_SPRITES: List[pygame.Surface] = None
+
+	# ids of the frame grid besides the body sprite ids, _STACK is a cell where several sprites overlap
+	_EMPTY, _FOOD, _STACK = 255, 254, 253
+
+	@staticmethod
+	def _load_assets():
+		if SnakeRenderer._FONT is not None:
+			return
+
+		pygame.font.init()
+		SnakeRenderer._FONT = pygame.font.SysFont('arial', 18)
+		SnakeRenderer._OPTIONS_TEXT = SnakeRenderer._FONT.render('ESC: MENU', True, (255, 255, 255))
+
+		SnakeRenderer._FOOD_SPRITE = _load_sprite('assets/sprites/apple.png', (20, 20))
+		SnakeRenderer._BODY_SPRITES = [
+			_load_sprite(f'assets/sprites/snake-body/{i}.png', (20, 20)) for i in range(1, 15)
+		]
+
+	def __init__(self, display: pygame.Surface):
+		SnakeRenderer._load_assets()
+		self.display = display
+
+		w, h = display.get_size()
+
+		# board and border drawn once, dirty cells are restored from it
+		self.background = pygame.Surface((w, h)).convert(display)
+		self.background.fill((207, 237, 154))
+		pygame.draw.rect(self.background, (130, 82, 0), pygame.Rect(0, 0, w, h), 40)
+
+		# what is drawn on every 20px cell, compared with the next frame to find the cells to redraw
+		self.drawn = np.full((w // 20, h // 20), SnakeRenderer._EMPTY, dtype=np.uint8)
+		self.frame = np.empty_like(self.drawn)
+		self.full = True
+
+		# text surfaces are rendered again only when their number changes
+		self.score = self.record = None
+		self.texts = [
+			(SnakeRenderer._OPTIONS_TEXT, SnakeRenderer._OPTIONS_TEXT.get_rect(topleft=(0, 0))), None, None
+		]
+
+	def invalidate(self):
+		# the display was drawn over, the next frame is drawn from scratch
+		self.full = True
+
+	def _text(self, i: int, text: str, center: Tuple[int, int], dirty: np.ndarray):
+		if self.texts[i] is not None:
+			self._mark(self.texts[i][1], dirty)
+
+		surface = SnakeRenderer._FONT.render(text, True, (255, 255, 255))
+		self.texts[i] = (surface, surface.get_rect(center=center))
+		self._mark(self.texts[i][1], dirty)
+
+	@staticmethod
+	def _cells(rect: pygame.Rect) -> Tuple[slice, slice]:
+		# the cells a rect covers, as indices into the frame grid
+		cols = slice(max(rect.left, 0) // 20, (rect.right - 1) // 20 + 1)
+		rows = slice(max(rect.top, 0) // 20, (rect.bottom - 1) // 20 + 1)
+		return cols, rows
+
+	@staticmethod
+	def _mark(rect: pygame.Rect, dirty: np.ndarray):
+		dirty[SnakeRenderer._cells(rect)] = True
+
+	def _draw_stack(self, game, rect: pygame.Rect, xs: np.ndarray, ys: np.ndarray, sprites: np.ndarray):
+		# same order as a full redraw: food, then the parts from the tail to the head
+		if game.food.pos == rect.topleft:
+			self.display.blit(SnakeRenderer._FOOD_SPRITE, rect)
+		for i in np.flatnonzero((xs == rect.x) & (ys == rect.y)).tolist():
+			self.display.blit(SnakeRenderer._BODY_SPRITES[sprites[i]], rect)
+
+	def render(self, game) -> List[pygame.Rect]:
+		# only cells whose content changed are drawn again, the returned rects go to pygame.display.update
+		frame = self.frame
+		frame.fill(SnakeRenderer._EMPTY)
+		frame[game.food.pos.x // 20, game.food.pos.y // 20] = SnakeRenderer._FOOD
+
+		xs, ys, sprites = game.snake.parts()
+		frame[xs // 20, ys // 20] = sprites
+
+		# sprites have transparent parts, so a head that ran into the body or a part over the food keeps
+		# what is under it, those cells are drawn layer by layer
+		head_x, head_y = game.snake.head_pos
+		food_x, food_y = game.food.pos
+		if np.count_nonzero((xs == head_x) & (ys == head_y)) > 1:
+			frame[head_x // 20, head_y // 20] = SnakeRenderer._STACK
+		if frame[food_x // 20, food_y // 20] != SnakeRenderer._FOOD:
+			frame[food_x // 20, food_y // 20] = SnakeRenderer._STACK
+
+		if self.full:
+			self.display.blit(self.background, (0, 0))
+			dirty = frame != SnakeRenderer._EMPTY
+		else:
+			dirty = frame != self.drawn
+
+		# the same id does not mean the same layers, so stacked cells are always drawn again
+		dirty[head_x // 20, head_y // 20] |= frame[head_x // 20, head_y // 20] == SnakeRenderer._STACK
+		dirty[food_x // 20, food_y // 20] |= frame[food_x // 20, food_y // 20] == SnakeRenderer._STACK
+
+		if game.score != self.score:
+			self.score = game.score
+			self._text(1, f'Score: {game.score}', (250, 10), dirty)
+		if game.record != self.record:
+			self.record = game.record
+			self._text(2, f'Best: {game.record}', (390, 10), dirty)
+
+		# text is blended over the cells, so a text over a redrawn cell is drawn again on a clean background
+		redraw = []
+		for surface, rect in self.texts:
+			if self.full or dirty[SnakeRenderer._cells(rect)].any():
+				self._mark(rect, dirty)
+				redraw.append((surface, rect))
+
+		rects = []
+		for x, y in np.argwhere(dirty).tolist():
+			rect = pygame.Rect(x * 20, y * 20, 20, 20)
+			self.display.blit(self.background, rect, rect)
+
+			cell = frame[x, y]
+			if cell == SnakeRenderer._STACK:
+				self._draw_stack(game, rect, xs, ys, sprites)
+			elif cell == SnakeRenderer._FOOD:
+				self.display.blit(SnakeRenderer._FOOD_SPRITE, rect)
+			elif cell != SnakeRenderer._EMPTY:
+				self.display.blit(SnakeRenderer._BODY_SPRITES[cell], rect)
+
+			rects.append(rect)
+
+		for surface, rect in redraw:
+			self.display.blit(surface, rect)
+
+		self.drawn, self.frame = frame, self.drawn
+
+		if self.full:
+			self.full = False
+			return [self.display.get_rect()]
+		return rects
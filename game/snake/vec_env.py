@@ -0,0 +1,198 @@
+import numpy as np
+from typing import Tuple
+
+from game.snake.game_objects import Food
+
+
+class VecSnakeGame:
+	# clockwise order, same as Agent.action_to_dir: RIGHT, DOWN, LEFT, UP
+	_DELTAS = np.array([[1, 0], [0, 1], [-1, 0], [0, -1]])
+
+	# action index -> turn (straight, right, left)
+	_TURNS = np.array([0, 1, -1])
+
+	def __init__(self, n_envs: int, win_size: Tuple[int, int] = (640, 480), seed: int = None):
+		self.n_envs = n_envs
+		self.w, self.h = win_size
+		self.rng = np.random.default_rng(seed)
+
+		# the board is stored in cells of 20px, walls included
+		self.cols, self.rows = self.w // 20, self.h // 20
+		self.capacity = self.cols * self.rows
+
+		# cell indices and free-set slots, int16 unless the board has more cells than that holds
+		self._index = np.int16 if self.capacity <= np.iinfo(np.int16).max else np.int32
+
+		self._walls = np.ones((self.cols, self.rows), dtype=np.uint8)
+		self._walls[1: (self.w - 40) // 20 + 1, 1: (self.h - 40) // 20 + 1] = 0
+
+		# food spawns in the same region as Food.create_new, on cells indexed by x * rows + y
+		xs, ys = np.meshgrid(Food.spawn_range(self.w), Food.spawn_range(self.h), indexing='ij')
+		self._food_cells = (xs * self.rows + ys).ravel()
+		self._food_slots = np.full(self.capacity, -1, dtype=self._index)
+		self._food_slots[self._food_cells] = np.arange(len(self._food_cells))
+
+		self._all = np.arange(n_envs)
+		self._actions = None
+
+		self.grid = np.empty((n_envs, self.cols, self.rows), dtype=np.uint8)
+		self.body = np.zeros((n_envs, self.capacity, 2), dtype=np.int16)
+		self.heads = np.zeros((n_envs, 2), dtype=np.int64)
+		self.food = np.zeros((n_envs, 2), dtype=np.int64)
+
+		# swap-remove sets of the free food cells of every board (see game_objects.FreeCells)
+		self.free_cells = np.zeros((n_envs, len(self._food_cells)), dtype=self._index)
+		self.free_slots = np.zeros((n_envs, self.capacity), dtype=self._index)
+		self.n_free = np.zeros(n_envs, dtype=np.int64)
+
+		self.head_idx = np.zeros(n_envs, dtype=np.int64)
+		self.body_len = np.zeros(n_envs, dtype=np.int64)
+		self.length = np.zeros(n_envs, dtype=np.int64)
+		self.direction = np.zeros(n_envs, dtype=np.int64)
+
+		self.score = np.zeros(n_envs, dtype=np.int64)
+		self.record = np.zeros(n_envs, dtype=np.int64)
+		self.frame_cnt = np.zeros(n_envs, dtype=np.int64)
+
+		self._reset(self._all)
+
+	def reset(self):
+		self._reset(self._all)
+
+	def _reset(self, idx: np.ndarray):
+		if idx.size == 0:
+			return
+
+		self.record[idx] = np.maximum(self.record[idx], self.score[idx])
+		self.score[idx] = self.frame_cnt[idx] = 0
+
+		self.grid[idx] = self._walls
+		self.free_cells[idx] = self._food_cells
+		self.free_slots[idx] = self._food_slots
+		self.n_free[idx] = len(self._food_cells)
+
+		# head in the middle of the board facing right, three body parts behind it
+		x, y = (self.w // 2) // 20, (self.h // 2) // 20
+		for i in range(4):
+			self.body[idx, i] = (x - 3 + i, y)
+			self.grid[idx, x - 3 + i, y] = 1
+			self._take_cell(idx, np.full(idx.size, (x - 3 + i) * self.rows + y))
+
+		self.heads[idx] = (x, y)
+		self.head_idx[idx] = 3
+		self.body_len[idx] = self.length[idx] = 4
+		self.direction[idx] = 0
+
+		self._place_food(idx)
+
+	def _take_cell(self, idx: np.ndarray, cells: np.ndarray):
+		slots = self.free_slots[idx, cells]
+		free = slots >= 0
+		idx, cells, slots = idx[free], cells[free], slots[free]
+
+		self.n_free[idx] -= 1
+		last = self.free_cells[idx, self.n_free[idx]]
+		self.free_cells[idx, slots] = last
+		self.free_slots[idx, last] = slots
+		self.free_slots[idx, cells] = -1
+
+	def _release_cell(self, idx: np.ndarray, cells: np.ndarray):
+		released = self._food_slots[cells] >= 0
+		idx, cells = idx[released], cells[released]
+
+		self.free_cells[idx, self.n_free[idx]] = cells
+		self.free_slots[idx, cells] = self.n_free[idx]
+		self.n_free[idx] += 1
+
+	def _place_food(self, idx: np.ndarray):
+		slots = self.rng.integers(0, self.n_free[idx])
+		cells = self.free_cells[idx, slots]
+		self.food[idx, 0] = cells // self.rows
+		self.food[idx, 1] = cells % self.rows
+
+	def step(self, actions):
+		actions = np.asarray(actions)
+		if actions.ndim == 2:
+			actions = actions.argmax(axis=1)
+
+		self.frame_cnt += 1
+
+		self.direction = (self.direction + VecSnakeGame._TURNS[actions]) % 4
+		new_heads = self.heads + VecSnakeGame._DELTAS[self.direction]
+
+		# free the tail unless the snake is still growing
+		growing = self.body_len < self.length
+		moving = np.flatnonzero(~growing)
+		tails = self.body[moving, (self.head_idx[moving] - self.body_len[moving] + 1) % self.capacity]
+		self.grid[moving, tails[:, 0], tails[:, 1]] = 0
+		self.body_len[growing] += 1
+
+		self.head_idx = (self.head_idx + 1) % self.capacity
+		self.body[self._all, self.head_idx] = new_heads
+		self.heads = new_heads
+
+		x, y = new_heads[:, 0], new_heads[:, 1]
+		collision = self.grid[self._all, x, y] != 0
+		dones = collision | (self.frame_cnt > 100 * self.body_len)
+
+		self.grid[self._all, x, y] = 1
+
+		# keep the free food cells in sync, finished boards are rebuilt by _reset
+		kept = ~dones[moving]
+		self._release_cell(moving[kept], tails[kept, 0] * self.rows + tails[kept, 1])
+
+		alive = np.flatnonzero(~dones)
+		self._take_cell(alive, x[alive] * self.rows + y[alive])
+
+		ate = ~dones & (new_heads == self.food).all(axis=1)
+		self.score += ate
+		self.length += ate
+
+		rewards = np.where(dones, -10, np.where(ate, 10, 0))
+		scores = self.score.copy()
+
+		# boards without a cell left for the food are cleared
+		cleared = ate & (self.n_free == 0)
+		dones |= cleared
+
+		self._place_food(np.flatnonzero(ate & ~cleared))
+		self._reset(np.flatnonzero(dones))
+
+		return rewards, dones, scores
+
+	# same interface as AsyncVecEnv, stepping here happens in step_wait
+	def step_async(self, actions):
+		self._actions = actions
+
+	def step_wait(self):
+		actions, self._actions = self._actions, None
+		return self.step(actions)
+
+	def get_state(self) -> np.ndarray:
+		d = self.direction
+		x, y = self.heads[:, 0], self.heads[:, 1]
+
+		ahead = VecSnakeGame._DELTAS[d]
+		right = VecSnakeGame._DELTAS[(d + 1) % 4]
+		left = VecSnakeGame._DELTAS[(d - 1) % 4]
+
+		state = np.empty((self.n_envs, 11), dtype=int)
+
+		# danger ahead, right and left
+		state[:, 0] = self.grid[self._all, x + ahead[:, 0], y + ahead[:, 1]] != 0
+		state[:, 1] = self.grid[self._all, x + right[:, 0], y + right[:, 1]] != 0
+		state[:, 2] = self.grid[self._all, x + left[:, 0], y + left[:, 1]] != 0
+
+		# move direction
+		state[:, 3] = d == 2
+		state[:, 4] = d == 0
+		state[:, 5] = d == 3
+		state[:, 6] = d == 1
+
+		# food location
+		state[:, 7] = self.food[:, 0] < x
+		state[:, 8] = self.food[:, 0] > x
+		state[:, 9] = self.food[:, 1] < y
+		state[:, 10] = self.food[:, 1] > y
+
+		return state
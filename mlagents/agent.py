@@ -1,22 +1,42 @@
+import time
 import pygame
 import random
+import contextlib
 import numpy as np
 from typing import Tuple
-from collections import deque
 
-from game.core import Direction
+from game.common import Direction
 from mlagents.model import DenseQNet
+from mlagents.policy import PolicyTable
+from mlagents.learner import BackgroundLearner
+from mlagents.profiling import profiler
+from mlagents.metrics import MetricsWriter
+from mlagents.replay import ReplayMemory, PrioritizedReplayMemory
+from mlagents.neuralnet.checkpoint import Checkpointer
 from game.snake.env import SnakeGame
-
-pygame.init()
-pygame.font.init()
+from game.snake.audio import SnakeAudio
+from game.snake.render import SnakeRenderer
+from game.snake.vec_env import VecSnakeGame
+from game.snake.async_vec_env import AsyncVecEnv
 
 
 MAX_MEMORY = 100_000
 BATCH_SIZE = 3000
 
+# the replayed batch is trained in minibatches of this size, EPOCHS times over
+MINIBATCH_SIZE = BATCH_SIZE
+EPOCHS = 1
+
+# train(background=True) replays at most once per this many remembered transitions
+STEPS_PER_UPDATE = 50
+
+# one row per game, written to metrics.csv (or .jsonl) by a background thread
+METRICS = ('game', 'score', 'loss', 'epsilon', 'length', 'steps_per_sec', 'wall_time')
+
 
 class Agent:
+    ACTIONS = ((1, 0, 0), (0, 1, 0), (0, 0, 1))
+
     @staticmethod
     def action_to_dir(curr_dir: Direction, action: Tuple[int, int, int]) -> Direction:
         dirs = [Direction.RIGHT, Direction.DOWN, Direction.LEFT, Direction.UP]
@@ -30,122 +50,258 @@ class Agent:
 
         return direction
 
-    def __init__(self, model=None):
+    def __init__(self, model=None, prioritized=False, memory=None, policy_table=True):
         self.n_games = 0
         self.epsilon = 0
 
-        self.memory = deque(maxlen=MAX_MEMORY)
+        if memory is None:
+            memory = PrioritizedReplayMemory(MAX_MEMORY) if prioritized else ReplayMemory(MAX_MEMORY)
+        self.memory = memory
 
-        self.model = DenseQNet(lr=0.001, gamma=0.9)
+        self.model = DenseQNet(lr=0.001, gamma=0.9, max_batch=BATCH_SIZE)
         if model:
             self.model.load(model)
 
+        # a frozen model is tabulated up front, a training one fills the table lazily between updates,
+        # without the table every action is a forward pass
+        self.policy = PolicyTable(self.model, eager=bool(model)) if policy_table else None
+
     def remember(self, state, action, reward, next_state, done):
-        self.memory.append((state, action, reward, next_state, done))
+        self.memory.append(state, np.argmax(action), reward, next_state, done)
 
-    def experience_replay(self):
-        if len(self.memory) > BATCH_SIZE:
-            sample = random.sample(self.memory, BATCH_SIZE)
-        else:
-            sample = self.memory
+    def experience_replay(self, minibatch_size=MINIBATCH_SIZE, epochs=EPOCHS, callback=None):
+        # the memory is trained on in place through the sampled indices
+        memory = self.memory
+        idx = memory.sample_indices(BATCH_SIZE)
 
-        states, actions, rewards, next_states, results = zip(*sample)
-        return self.model.train_step(states, actions, rewards, next_states, results)
+        prioritized = isinstance(memory, PrioritizedReplayMemory)
+        weights = memory.importance_weights(idx) if prioritized else None
+
+        loss = self.model.fit_transitions(
+            memory.states, memory.actions, memory.rewards, memory.next_states, memory.dones,
+            minibatch_size, epochs, idx, weights, callback
+        )
+
+        if prioritized:
+            memory.update_priorities(idx, self.model.td_errors)
+        return loss
 
     def train_step(self, state, action, reward, next_state, result):
-        self.model.train_step(state, [action], [reward], [next_state], [result])
+        self.model.train_step(state, [np.argmax(action)], [reward], [next_state], [result])
 
     def get_action(self, state):
         self.epsilon = 80 - self.n_games
         if random.randint(0, 200) < self.epsilon:
-            action = [0, 0, 0]
-            action[random.randint(0, 2)] = 1
-            return action[0], action[1], action[2]
+            return Agent.ACTIONS[random.randint(0, 2)]
 
         return self.predict_action(state)
 
     def predict_action(self, state):
-        action = [0, 0, 0]
+        if self.policy is None:
+            return Agent.ACTIONS[self.model.infer(state)]
+        return Agent.ACTIONS[self.policy.action(state)]
+
+    def get_actions(self, states):
+        self.epsilon = 80 - self.n_games
+
+        actions = np.argmax(self.model.predict(states), axis=1)
+        explore = np.random.randint(0, 201, len(actions)) < self.epsilon
+        actions[explore] = np.random.randint(0, 3, np.count_nonzero(explore))
 
-        prediction = self.model.predict(state)
-        move = np.argmax(prediction)
+        return actions
 
-        action[move] = 1
 
-        return action[0], action[1], action[2]
+def attach_display(env: SnakeGame):
+    pygame.init()
 
+    display = pygame.display.set_mode(env.win_size)
+    env.renderer = SnakeRenderer(display)
+    env.audio = SnakeAudio()
 
-def train():
+    return pygame.time.Clock()
+
+
+def handle_events():
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            quit()
+
+
+def train(headless=False, prioritized=False, background=False, metrics_file='metrics.csv'):
+    # background replays on a learner thread instead of per frame and at every game over
     record = 0
 
-    display = pygame.display.set_mode((640, 480))
-    env = SnakeGame(display)
-    agent = Agent()
+    env = SnakeGame()
 
-    clock = pygame.time.Clock()
+    # training every frame changes the weights before every lookup, so the table would never hit
+    agent = Agent(prioritized=prioritized, policy_table=background)
 
-    while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                quit()
+    learner = BackgroundLearner(agent, BATCH_SIZE, MINIBATCH_SIZE, EPOCHS, STEPS_PER_UPDATE) if background else None
+    lock = learner.lock if learner is not None else contextlib.nullcontext()
 
-        # get state and action
-        state = env.get_state()
-        action = agent.get_action(state)
+    clock = None if headless else attach_display(env)
 
-        # perform move and get new state
-        reward, game_over, score = env.step(Agent.action_to_dir(env.snake.head.direction, action))
-        state_new = env.get_state()
+    latest = Checkpointer(agent.model, 'latest_episode.pkl', every_seconds=30, keep=3)
+    best = Checkpointer(agent.model, 'snake_agent.pkl', on_best=True, best=0)
+    metrics = MetricsWriter(metrics_file, METRICS, max_bytes=64 << 20)
 
-        # train the current action
-        agent.train_step(state, action, reward, state_new, game_over)
-        agent.remember(state, action, reward, state_new, game_over)
+    if learner is not None:
+        learner.start()
 
-        # save current model
-        agent.model.save('latest_episode.pkl')
+    start = episode_start = time.monotonic()
 
-        if game_over:
-            env.reset()
-            agent.n_games += 1
-            loss = agent.experience_replay()
+    # states are extracted straight into these, in the network's dtype
+    state, state_new = np.zeros((2, 11), dtype=agent.model.dtype)
+
+    # the learner thread is stopped between updates, never in the middle of publish()
+    try:
+        while True:
+            if clock is not None:
+                handle_events()
+
+            # get state and action
+            with profiler.timer('get_state'):
+                env.get_state(state)
+            with profiler.timer('get_action'), lock:
+                action = agent.get_action(state)
+
+            # perform move and get new state
+            with profiler.timer('env.step'):
+                reward, game_over, score = env.step(Agent.action_to_dir(env.snake.direction, action))
+            with profiler.timer('get_state'):
+                env.get_state(state_new)
 
-            # write data to csv
-            with open('losses.csv', 'a') as f:
-                f.write(f'{agent.n_games},{score}\n')
+            # train the current action
+            if learner is None:
+                with profiler.timer('train_step'):
+                    agent.train_step(state, action, reward, state_new, game_over)
 
-            if score > record:
-                record = score
-                agent.model.save()
+            with lock:
+                with profiler.timer('remember'):
+                    agent.remember(state, action, reward, state_new, game_over)
+                if learner is not None:
+                    learner.step()
 
-            print(f'Game: {agent.n_games} \tScore: {score} \tBest Score: {record} \tLoss: {loss}')
+                # save current model in the background every now and then
+                with profiler.timer('checkpoint'):
+                    latest.step()
 
-        env.render()
-        clock.tick(30)
+            profiler.step()
 
+            if game_over:
+                length = env.frame_cnt
+                env.reset()
+                agent.n_games += 1
 
-def play():
-    display = pygame.display.set_mode((640, 480))
-    env = SnakeGame(display)
+                if learner is None:
+                    with profiler.timer('experience_replay'):
+                        loss = agent.experience_replay()
+                else:
+                    loss = learner.loss
+
+                now = time.monotonic()
+                metrics.write(
+                    game=agent.n_games, score=score, loss=loss, epsilon=agent.epsilon, length=length,
+                    steps_per_sec=length / (now - episode_start), wall_time=now - start
+                )
+                episode_start = now
+
+                with lock:
+                    best.step(score)
+                record = max(record, score)
+
+                print(f'Game: {agent.n_games} \tScore: {score} \tBest Score: {record} \tLoss: {loss}')
+
+                profiler.gauge('replay.size', len(agent.memory))
+                profiler.game_over()
+
+            if clock is not None:
+                with profiler.timer('render'):
+                    pygame.display.update(env.render())
+                with profiler.timer('clock.tick'):
+                    clock.tick(30)
+    finally:
+        if learner is not None:
+            learner.stop()
+
+
+def train_vectorized(n_envs=256, prioritized=False, workers=0):
+    # workers > 0 steps SnakeGame instances in that many processes instead of the array based VecSnakeGame
+    record = 0
+
+    env = AsyncVecEnv(n_envs, workers) if workers else VecSnakeGame(n_envs)
+    agent = Agent(prioritized=prioritized)
+
+    best = Checkpointer(agent.model, 'snake_agent.pkl', on_best=True, best=0)
+
+    # scores of the games that ended last step, and transitions stored since the last replay
+    finished = []
+    fresh = 0
+    loss = None
+
+    # the worker processes and the shared block of AsyncVecEnv are released however the loop ends
+    try:
+        while True:
+            states = env.get_state()
+            actions = agent.get_actions(states)
+            env.step_async(actions)
+
+            # one replay per BATCH_SIZE new transitions, so the replay work per transition does not depend on
+            # n_envs or on how short the games are, run while the workers simulate this step
+            if fresh >= BATCH_SIZE:
+                fresh -= BATCH_SIZE
+                loss = agent.experience_replay()
+
+            for score in finished:
+                agent.n_games += 1
+
+                best.step(score)
+                record = max(record, score)
+
+                print(f'Game: {agent.n_games} \tScore: {score} \tBest Score: {record} \tLoss: {loss}')
+
+            rewards, game_over, scores = env.step_wait()
+            states_new = env.get_state()
+
+            agent.memory.extend(states, actions, rewards, states_new, game_over)
+            finished = scores[game_over].tolist()
+            fresh += len(actions)
+    finally:
+        if hasattr(env, 'close'):
+            env.close()
+
+
+def play(headless=False):
+    env = SnakeGame()
     agent = Agent(model='assets/snake_agent.pkl')
 
-    clock = pygame.time.Clock()
+    clock = None if headless else attach_display(env)
+    state = np.zeros(11, dtype=agent.model.dtype)
 
     while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                quit()
+        if clock is not None:
+            handle_events()
 
-        state = env.get_state()
-        action = agent.predict_action(state)
-        _, game_over, _ = env.step(Agent.action_to_dir(env.snake.head.direction, action))
+        with profiler.timer('get_state'):
+            env.get_state(state)
+        with profiler.timer('get_action'):
+            action = agent.predict_action(state)
+        with profiler.timer('env.step'):
+            _, game_over, score = env.step(Agent.action_to_dir(env.snake.direction, action))
+        profiler.step()
 
         if game_over:
             env.reset()
-
-        env.render()
-        clock.tick(30)
+            if headless:
+                print(f'Score: {score} \tBest Score: {env.record}')
+            profiler.game_over()
+
+        if clock is not None:
+            with profiler.timer('render'):
+                pygame.display.update(env.render())
+            with profiler.timer('clock.tick'):
+                clock.tick(30)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,133 @@
+import os
+import time
+import random
+import numpy as np
+import multiprocessing as mp
+
+from game.snake.env import SnakeGame
+from mlagents.agent import Agent, MAX_MEMORY, BATCH_SIZE, MINIBATCH_SIZE, EPOCHS
+from mlagents.shared import SharedArrays, SharedReplayMemory, SharedWeights
+from mlagents.neuralnet.checkpoint import Checkpointer
+
+# actors look for new weights every SYNC_EVERY steps, the learner publishes them every PUBLISH_EVERY updates
+SYNC_EVERY = 100
+PUBLISH_EVERY = 1
+
+
+def _stats_spec(n_actors):
+    return [(key, (n_actors,), np.int64) for key in ('steps', 'games', 'record')]
+
+
+def _act(rank, n_actors, names, stop, seed):
+    # actor process: plays with its own copy of the policy and writes into its partition of the replay memory
+    random.seed(seed)
+    np.random.seed(seed)
+
+    memory = SharedReplayMemory(MAX_MEMORY, n_actors, name=names['memory'], partition=rank)
+    agent = Agent(memory=memory)
+    weights = SharedWeights(agent.model, names['weights'])
+    stats = SharedArrays(_stats_spec(n_actors), names['stats'])
+
+    env = SnakeGame(seed=seed)
+    steps = 0
+
+    while not stop.is_set():
+        if steps % SYNC_EVERY == 0:
+            weights.pull(agent.model)
+
+        state = env.get_state()
+        action = agent.get_action(state)
+        reward, game_over, score = env.step(Agent.action_to_dir(env.snake.direction, action))
+        agent.remember(state, action, reward, env.get_state(), game_over)
+
+        steps += 1
+        stats['steps'][rank] = steps
+
+        if game_over:
+            env.reset()
+            agent.n_games += 1
+            stats['games'][rank] += 1
+            stats['record'][rank] = max(stats['record'][rank], score)
+
+    stats.close()
+    weights.close()
+    memory.close()
+
+
+def train_distributed(n_actors=None, duration=None, checkpoint='snake_agent.pkl', verbose=True):
+    # n_actors processes step games into a shared replay memory, this process is the learner
+    n_actors = n_actors or max(os.cpu_count() - 1, 1)
+
+    memory = SharedReplayMemory(MAX_MEMORY, n_actors)
+    agent = Agent(memory=memory)
+    weights = SharedWeights(agent.model)
+    weights.publish(agent.model)
+    stats = SharedArrays(_stats_spec(n_actors))
+
+    stop = mp.Event()
+    names = {'memory': memory.name, 'weights': weights.name, 'stats': stats.name}
+    actors = [
+        mp.Process(target=_act, args=(rank, n_actors, names, stop, random.randrange(1 << 32)), daemon=True)
+        for rank in range(n_actors)
+    ]
+    for actor in actors:
+        actor.start()
+
+    # started after the actors, so no process is forked while the writer thread runs
+    best = Checkpointer(agent.model, checkpoint, on_best=True, best=0) if checkpoint else None
+
+    start = last_report = time.monotonic()
+    updates = 0
+    loss = None
+
+    try:
+        while duration is None or time.monotonic() - start < duration:
+            if len(memory) < BATCH_SIZE:
+                time.sleep(0.01)
+                continue
+
+            # a copied batch, the actors keep writing into the memory while the learner trains
+            loss = agent.model.fit_transitions(*memory.sample(BATCH_SIZE), MINIBATCH_SIZE, EPOCHS)
+            updates += 1
+            if updates % PUBLISH_EVERY == 0:
+                weights.publish(agent.model)
+
+            now = time.monotonic()
+            if now - last_report >= 5:
+                record = int(stats['record'].max())
+                if best is not None:
+                    best.step(record)
+
+                if verbose:
+                    steps = int(stats['steps'].sum())
+                    print(
+                        f'Steps: {steps} \tSteps/s: {steps / (now - start):.0f} \tUpdates: {updates} '
+                        f'\tGames: {int(stats["games"].sum())} \tBest Score: {record} \tLoss: {loss}'
+                    )
+                last_report = now
+
+    finally:
+        stop.set()
+        for actor in actors:
+            actor.join()
+
+        summary = {
+            'actors': n_actors,
+            'seconds': time.monotonic() - start,
+            'steps': int(stats['steps'].sum()),
+            'games': int(stats['games'].sum()),
+            'updates': updates,
+            'record': int(stats['record'].max())
+        }
+
+        if best is not None:
+            best.close()
+        stats.close()
+        weights.close()
+        memory.close()
+
+    return summary
+
+
+if __name__ == '__main__':
+    train_distributed()
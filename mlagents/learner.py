@@ -0,0 +1,89 @@
+import copy
+import threading
+import numpy as np
+
+from mlagents.neuralnet._ABC import Layer
+from mlagents.replay import PrioritizedReplayMemory
+
+
+def _layers(net):
+    return [layer for layer in net.layers if isinstance(layer, Layer)]
+
+
+class BackgroundLearner:
+    # replays the agent's memory on a copy of its network in a thread and swaps the new weights into the acting
+    # network after every update, anything reading the memory or the acting network from another thread holds lock
+    # updates start once the memory holds batch_size transitions and run at most once per steps_per_update
+    # transitions counted by step(), so the learner neither refits a tiny memory nor outpaces the actor
+    def __init__(self, agent, batch_size, minibatch_size=None, epochs=1, steps_per_update=1):
+        self.agent = agent
+        self.batch_size = batch_size
+        self.minibatch_size = minibatch_size or batch_size
+        self.epochs = epochs
+        self.steps_per_update = steps_per_update
+
+        # the acting network's parameters are written into once swapped out as back buffers
+        agent.model.writable()
+
+        self.lock = threading.Lock()
+        self.net = copy.deepcopy(agent.model)
+
+        # back buffers of the acting network's parameters, filled outside the lock and swapped in under it
+        self.back = [(layer.weights.copy(), layer.bias.copy()) for layer in _layers(agent.model)]
+
+        self.loss = None
+        self.updates = 0
+        self.steps = 0
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def step(self, n=1):
+        # n transitions were remembered, called under lock
+        self.steps += n
+
+    def _run(self):
+        memory = self.agent.memory
+        prioritized = isinstance(memory, PrioritizedReplayMemory)
+
+        while not self._stop.is_set():
+            # copy a batch out under the lock, training on it runs without
+            with self.lock:
+                due = len(memory) >= self.batch_size and self.updates * self.steps_per_update < self.steps
+                batch = memory.sample(self.batch_size) if due else None
+
+            if batch is None:
+                self._stop.wait(0.01)
+                continue
+
+            weights = batch[6] if prioritized else None
+            self.loss = self.net.fit_transitions(*batch[:5], self.minibatch_size, self.epochs, weights=weights)
+
+            if prioritized:
+                with self.lock:
+                    memory.update_priorities(batch[5], self.net.td_errors)
+
+            self.publish()
+            self.updates += 1
+
+    def publish(self):
+        for (weights, bias), layer in zip(self.back, _layers(self.net)):
+            np.copyto(weights, layer.weights)
+            np.copyto(bias, layer.bias)
+
+        # the optimizer state goes along, so checkpoints of the acting network resume like the learner
+        state = self.net.optimizer.get_state()
+
+        with self.lock:
+            acting = self.agent.model
+            self.back = [layer.swap(weights, bias) for layer, (weights, bias) in zip(_layers(acting), self.back)]
+            acting.optimizer.set_state(state)
+            acting.version += 1
@@ -0,0 +1,97 @@
+import os
+import csv
+import json
+import time
+import atexit
+import threading
+
+
+class MetricsWriter:
+    # rows are buffered in memory and written by a background thread every flush_rows rows or flush_seconds,
+    # as csv or json lines depending on the file extension, rotated to filename.1.. once max_bytes is reached
+    def __init__(self, filename, fields, flush_rows=100, flush_seconds=5.0, max_bytes=None, keep=3):
+        self.filename = filename
+        self.fields = list(fields)
+        self.jsonl = os.path.splitext(filename)[1] in ('.jsonl', '.json')
+
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.max_bytes = max_bytes
+        self.keep = keep
+
+        self._rows = []
+        self._flush = False
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def write(self, **row):
+        with self._cond:
+            self._rows.append(row)
+            if len(self._rows) >= self.flush_rows:
+                self._cond.notify()
+
+    def flush(self):
+        with self._cond:
+            self._flush = True
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+
+        self._writer.join()
+
+    def _rotate(self):
+        # keep files in total: filename.(keep - 1) is dropped, filename.k becomes filename.(k + 1)
+        # and filename becomes filename.1
+        for k in range(self.keep - 2, 0, -1):
+            if os.path.exists(f'{self.filename}.{k}'):
+                os.replace(f'{self.filename}.{k}', f'{self.filename}.{k + 1}')
+
+        if self.keep > 1:
+            os.replace(self.filename, f'{self.filename}.1')
+        else:
+            os.remove(self.filename)
+
+    def _dump(self, rows):
+        if self.max_bytes is not None and os.path.exists(self.filename) and os.path.getsize(self.filename) >= self.max_bytes:
+            self._rotate()
+
+        header = not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0
+        with open(self.filename, 'a', newline='') as f:
+            if self.jsonl:
+                f.writelines(json.dumps(row) + '\n' for row in rows)
+                return
+
+            writer = csv.DictWriter(f, self.fields, extrasaction='ignore')
+            if header:
+                writer.writeheader()
+            writer.writerows(rows)
+
+    def _write_loop(self):
+        deadline = time.monotonic() + self.flush_seconds
+
+        while True:
+            with self._cond:
+                while not (self._closed or self._flush or len(self._rows) >= self.flush_rows):
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    self._cond.wait(timeout)
+
+                rows, self._rows = self._rows, []
+                closed, self._flush = self._closed, False
+
+            if rows:
+                self._dump(rows)
+            deadline = time.monotonic() + self.flush_seconds
+
+            if closed:
+                return
@@ -1,40 +1,78 @@
 import numpy as np
 
-from mlagents.neuralnet.api import NeuralNet
+from mlagents.neuralnet.api import NeuralNet, minibatches
 from mlagents.neuralnet.layers import Dense, ReLU
 
 from mlagents.neuralnet.losses import MSE
+from mlagents.neuralnet.optimizers import SGD
+from mlagents.profiling import profiler
 
 
 class DenseQNet(NeuralNet):
-    def __init__(self, lr=0.01, gamma=0.9):
+    def __init__(self, lr=0.01, gamma=0.9, dtype=np.float32, max_batch=1, optimizer=None):
         super().__init__([
             Dense(11, 256),
             ReLU(),
             Dense(256, 128),
             ReLU(),
             Dense(128, 3)
-        ])
-        self.loss = MSE
+        ], dtype)
+        # lr only configures the default optimizer
+        self.compile(MSE, optimizer if optimizer is not None else SGD(lr), max_batch)
 
-        self.lr = lr
         self.gamma = gamma
 
-    def save(self, filename='snake_agent.pkl'):
-        super().save(filename)
+        # target - prediction of the taken actions in the last train_step, used for prioritized replay
+        self.td_errors = None
 
-    def load(self, filename='snake_agent.pkl'):
-        super().load(filename)
+    def save(self, filename='snake_agent.pkl', binary=False):
+        super().save(filename, binary)
 
-    def train_step(self, states, actions, rewards, next_states, results):
-        predicted = self.predict(np.array(states))
+    def load(self, filename='snake_agent.pkl', mmap=False):
+        super().load(filename, mmap)
 
-        target = predicted.copy()
-        for idx in range(len(results)):
-            q_new = rewards[idx]
-            if not results[idx]:
-                q_new += self.gamma * np.max(self.predict(next_states[idx]))
+    def train_step(self, states, actions, rewards, next_states, results, weights=None):
+        states = np.array(states, ndmin=2)
+        next_states = np.array(next_states, ndmin=2)
+        rewards = np.asarray(rewards)
+        rows, actions = np.arange(len(states)), np.asarray(actions)
 
-            target[idx][np.argmax(actions[idx])] = q_new
+        # bellman targets for the whole batch: r for terminal transitions, r + gamma * max Q(s') otherwise
+        with profiler.timer('model.targets'):
+            q_next = self.predict(next_states).max(axis=1)
+            q_new = np.where(results, rewards, rewards + self.gamma * q_next)
 
-        return self.train(np.array(states), target, self.lr)
+            predicted = self.predict(states)
+            target = predicted.copy()
+            target[rows, actions] = q_new
+
+        self.td_errors = q_new - predicted[rows, actions]
+
+        with profiler.timer('model.train'):
+            return self.train(states, target, weights)
+
+    def fit_transitions(self, states, actions, rewards, next_states, results, batch_size=32, epochs=1,
+                        indices=None, weights=None, callback=None, shuffle=True):
+        # minibatch train steps over the rows listed in indices (all of them by default), so replay memory
+        # arrays can be passed as they are and only each minibatch is gathered
+        if indices is None:
+            indices = np.arange(len(actions))
+
+        # td errors line up with indices, a row seen in several epochs keeps its last error
+        td_errors = np.zeros(len(indices), dtype=self.dtype)
+
+        losses = []
+        for epoch, batch, pos in minibatches(len(indices), batch_size, epochs, shuffle):
+            idx = indices[pos]
+            loss = self.train_step(
+                states.take(idx, axis=0), actions[idx], rewards[idx], next_states.take(idx, axis=0), results[idx],
+                None if weights is None else weights[pos]
+            )
+            td_errors[pos] = self.td_errors
+            losses.append(loss)
+
+            if callback is not None:
+                callback(epoch, batch, loss)
+
+        self.td_errors = td_errors
+        return float(np.mean(losses)) if losses else None
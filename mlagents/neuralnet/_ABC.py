@@ -1,3 +1,4 @@
+import numpy as np
 from abc import abstractmethod, ABCMeta
 
 
@@ -5,15 +6,36 @@ class Layer(metaclass=ABCMeta):
     @abstractmethod
     def __init__(self):
         self.weights = self.bias = None
+        self.grad_w = self.grad_b = None
 
     @abstractmethod
     def forward(self, inp):
         raise NotImplementedError
 
     @abstractmethod
-    def backward(self, inp, lr):
+    def backward(self, grad):
         raise NotImplementedError
 
+    @abstractmethod
+    def infer(self, inp):
+        raise NotImplementedError
+
+    def cast(self, dtype):
+        self.weights = np.asarray(self.weights, dtype=dtype)
+        self.bias = np.asarray(self.bias, dtype=dtype)
+        self.grad_w = np.zeros_like(self.weights)
+        self.grad_b = np.zeros_like(self.bias)
+
+    def swap(self, weights, bias):
+        # take another set of parameters of the same shape, the old ones are returned for reuse
+        old = self.weights, self.bias
+        self.weights, self.bias = weights, bias
+        return old
+
+    def params(self):
+        # (parameter, gradient) pairs, backward fills the gradients and an optimizer applies them
+        return [(self.weights, self.grad_w), (self.bias, self.grad_b)]
+
 
 class Activation(metaclass=ABCMeta):
     @abstractmethod
@@ -21,5 +43,9 @@ class Activation(metaclass=ABCMeta):
         raise NotImplementedError
 
     @abstractmethod
-    def backward(self, inp, lr):
+    def backward(self, grad):
+        raise NotImplementedError
+
+    @abstractmethod
+    def infer(self, inp):
         raise NotImplementedError
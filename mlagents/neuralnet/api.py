@@ -1,62 +1,199 @@
+import os
 import pickle
+import tempfile
 import numpy as np
 
 from mlagents.neuralnet._ABC import Layer
+from mlagents.neuralnet.layers import _workspace
+from mlagents.neuralnet.optimizers import SGD
+from mlagents.neuralnet.plan import build_plan
+from mlagents.neuralnet.serialization import dump_binary, load_snapshot
+
+
+def minibatches(n, batch_size, epochs=1, shuffle=True):
+    # (epoch, batch, positions) covering range(n) once per epoch, reshuffled every epoch
+    for epoch in range(epochs):
+        order = np.random.permutation(n) if shuffle else np.arange(n)
+        for batch, start in enumerate(range(0, n, batch_size)):
+            yield epoch, batch, order[start: start + batch_size]
 
 
 class NeuralNet:
-    def __init__(self, layers):
+    def __init__(self, layers, dtype=np.float32):
         self.layers = layers
         self.loss = None
+        self.optimizer = None
+        self.plan = None
+
+        # every parameter, activation and gradient is kept in the compute dtype
+        self.dtype = np.dtype(dtype)
+        for layer in self.layers:
+            if isinstance(layer, Layer):
+                layer.cast(self.dtype)
+
+        self.inp_buffer = None
+        self.row_buffer = None
+
+        # bumped whenever the parameters change, so caches of the outputs know when to refresh
+        self.version = 0
+
+        # set by load(mmap=True), the parameters may be read-only maps of the file
+        self.mapped = False
 
-    def compile(self, loss):
+    def compile(self, loss, optimizer=None, max_batch=1):
+        # run as a flat list of fused kernels with buffers sized for max_batch (they still grow if needed)
         self.loss = loss
+        self.optimizer = optimizer if optimizer is not None else SGD()
+        self.optimizer.bind(self.params())
+        self.plan = build_plan(self.layers, max_batch)
 
-    def predict(self, inp) -> np.ndarray:
+        if isinstance(self.layers[0], Layer):
+            self.inp_buffer = _workspace(self.inp_buffer, max_batch, self.layers[0].weights.shape[0], self.dtype)
+
+    @property
+    def ops(self):
+        return self.plan if self.plan is not None else self.layers
+
+    def _forward(self, inp) -> np.ndarray:
         assert len(self.layers) > 0
 
         if len(inp.shape) == 1:
             inp = inp[np.newaxis, ...]
 
+        # cast the input into a reusable buffer instead of a fresh array
+        if inp.dtype != self.dtype:
+            self.inp_buffer = _workspace(self.inp_buffer, len(inp), inp.shape[1], self.dtype)
+            buffer = self.inp_buffer[:len(inp)]
+            np.copyto(buffer, inp)
+            inp = buffer
+
         pred = inp
-        for layer in self.layers:
-            pred = layer.forward(pred)
+        for op in self.ops:
+            pred = op.forward(pred)
 
         return pred
 
-    def backward(self, loss_grad, lr=0.01):
-        for layer in reversed(self.layers):
-            loss_grad = layer.backward(loss_grad, lr)
+    def predict(self, inp) -> np.ndarray:
+        # layers write into reused buffers, so hand out a copy
+        return self._forward(np.asarray(inp)).copy()
+
+    def infer_row(self, state) -> np.ndarray:
+        # outputs for a single state without caching activations or allocating, valid until the next call
+        if self.row_buffer is None or len(self.row_buffer) != len(state):
+            self.row_buffer = np.empty(len(state), dtype=self.dtype)
+        np.copyto(self.row_buffer, state)
+
+        out = self.row_buffer
+        for op in self.ops:
+            out = op.infer(out)
 
-    def train(self, inp, target, lr=0.01):
-        assert len(self.layers) > 0 and self.loss is not None
+        return out
 
-        pred = self.predict(inp)
-        loss = self.loss.calc_loss(target, pred)
+    def infer(self, state) -> int:
+        # index of the highest output for a single state
+        return int(self.infer_row(state).argmax())
 
-        grad = self.loss.gradient(target, pred)
-        self.backward(grad, lr)
+    def params(self):
+        return [pair for layer in self.layers if isinstance(layer, Layer) for pair in layer.params()]
+
+    def writable(self):
+        # mapped parameters are copied into memory before the first update writes to them
+        if not self.mapped:
+            return
+
+        for layer in self.layers:
+            if isinstance(layer, Layer) and not (layer.weights.flags.writeable and layer.bias.flags.writeable):
+                layer.swap(layer.weights.copy(), layer.bias.copy())
+        self.mapped = False
+
+    def backward(self, loss_grad):
+        # layers only fill their gradients, the optimizer applies all of them at once
+        self.writable()
+        for op in reversed(self.ops):
+            loss_grad = op.backward(loss_grad)
+
+        self.optimizer.step(self.params())
+        self.version += 1
+
+    def train(self, inp, target, weights=None):
+        assert len(self.layers) > 0 and self.loss is not None and self.optimizer is not None
+
+        pred = self._forward(np.asarray(inp))
+        loss = self.loss.calc_loss(target, pred, weights)
+
+        grad = self.loss.gradient(target, pred, weights).astype(self.dtype, copy=False)
+        self.backward(grad)
 
         return loss
 
-    def save(self, filename):
+    def fit(self, inp, target, batch_size=32, epochs=1, shuffle=True, weights=None, callback=None):
+        # one train step per minibatch, the data is only indexed through a permutation and never reordered
+        # callback(epoch, batch, loss) is called after every step, the mean loss is returned
+        inp, target = np.asarray(inp), np.asarray(target)
+
+        losses = []
+        for epoch, batch, pos in minibatches(len(inp), batch_size, epochs, shuffle):
+            loss = self.train(
+                inp.take(pos, axis=0), target.take(pos, axis=0), None if weights is None else weights[pos]
+            )
+            losses.append(loss)
+
+            if callback is not None:
+                callback(epoch, batch, loss)
+
+        return float(np.mean(losses)) if losses else None
+
+    def snapshot(self):
         weights = []
         biases = []
         for layer in self.layers:
             if isinstance(layer, Layer):
-                weights.append(layer.weights)
-                biases.append(layer.bias)
-
-        with open(filename, 'wb') as f:
-            pickle.dump([weights, biases], f)
-
-    def load(self, filename):
-        with open(filename, 'rb') as f:
-            weights, biases = pickle.load(f)
+                weights.append(layer.weights.copy())
+                biases.append(layer.bias.copy())
+
+        # the optimizer state goes along so a resumed run does not warm its moments up again
+        if self.optimizer is None:
+            return [weights, biases]
+        return [weights, biases, self.optimizer.get_state()]
+
+    @staticmethod
+    def write_snapshot(snapshot, filename, binary=False):
+        # write next to the target and rename over it, readers never see a partial file
+        directory, name = os.path.split(os.path.abspath(filename))
+        fd, tmp = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if binary:
+                    dump_binary(snapshot, f)
+                else:
+                    pickle.dump(snapshot, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, filename)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def save(self, filename, binary=False):
+        NeuralNet.write_snapshot(self.snapshot(), filename, binary)
+
+    def load(self, filename, mmap=False):
+        # pickles and binary files are both accepted, mmap maps a binary file read-only instead of copying it
+        # (mapped weights in the compute dtype stay shared with the file until the first update copies them)
+        snapshot = load_snapshot(filename, mmap)
+        weights, biases = snapshot[:2]
 
         index = 0
         for i in range(len(self.layers)):
             if isinstance(self.layers[i], Layer):
                 self.layers[i].weights = weights[index]
                 self.layers[i].bias = biases[index]
+                self.layers[i].cast(self.dtype)
                 index += 1
+        self.mapped = mmap
+
+        if self.optimizer is not None:
+            self.optimizer.bind(self.params())
+            self.optimizer.set_state(snapshot[2] if len(snapshot) > 2 else None)
+
+        self.version += 1
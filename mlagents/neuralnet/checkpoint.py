@@ -0,0 +1,98 @@
+import os
+import sys
+import time
+import shutil
+import atexit
+import threading
+
+from mlagents.neuralnet.api import NeuralNet
+
+
+class Checkpointer:
+    def __init__(self, net: NeuralNet, filename, every_steps=None, every_seconds=None, on_best=False, keep=1, binary=False, best=None):
+        self.net = net
+        self.filename = filename
+        self.binary = binary
+
+        self.every_steps = every_steps
+        self.every_seconds = every_seconds
+        self.on_best = on_best
+        self.keep = keep
+
+        # on_best saves only scores above this one, None saves the first score whatever it is
+        self.steps = 0
+        self.best = best
+        self.last_save = time.monotonic()
+
+        # the latest snapshot waiting for the writer, older pending ones are dropped
+        self._pending = None
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def step(self, score=None):
+        self.steps += 1
+
+        due = (
+            (self.every_steps is not None and self.steps % self.every_steps == 0) or
+            (self.every_seconds is not None and time.monotonic() - self.last_save >= self.every_seconds)
+        )
+
+        if self.on_best and score is not None and (self.best is None or score > self.best):
+            self.best = score
+            due = True
+
+        if due:
+            self.save()
+
+        return due
+
+    def save(self):
+        self.last_save = time.monotonic()
+        snapshot = self.net.snapshot()
+
+        with self._cond:
+            self._pending = snapshot
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+        self._writer.join()
+
+    def _rotate(self):
+        # filename.(keep - 1) is dropped, filename.k becomes filename.(k + 1) and filename becomes filename.1
+        for k in range(self.keep - 1, 1, -1):
+            if os.path.exists(f'{self.filename}.{k - 1}'):
+                os.replace(f'{self.filename}.{k - 1}', f'{self.filename}.{k}')
+
+        # hard link the current file so it stays in place until the new one is renamed over it
+        if self.keep > 1 and os.path.exists(self.filename):
+            if os.path.exists(f'{self.filename}.1'):
+                os.remove(f'{self.filename}.1')
+            try:
+                os.link(self.filename, f'{self.filename}.1')
+            except OSError:
+                shutil.copyfile(self.filename, f'{self.filename}.1')
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+
+                snapshot, self._pending = self._pending, None
+                if snapshot is None:
+                    return
+
+            # a failed save (disk full, permissions) is reported and the writer keeps going with the next snapshot
+            try:
+                self._rotate()
+                NeuralNet.write_snapshot(snapshot, self.filename, self.binary)
+            except Exception as e:
+                print(f'Checkpoint {self.filename} not saved: {type(e).__name__}: {e}', file=sys.stderr)
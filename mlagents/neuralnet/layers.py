@@ -3,12 +3,28 @@ import numpy as np
 from mlagents.neuralnet._ABC import Layer, Activation
 
 
+def _workspace(buffer, n, cols, dtype):
+    # rows [:n] of a buffer grown to the largest batch seen so far, views of a C array stay contiguous
+    if buffer is None or buffer.shape[0] < n or buffer.dtype != dtype:
+        buffer = np.empty((n, cols), dtype=dtype)
+    return buffer
+
+
 class ReLU(Activation):
+    def __init__(self):
+        self.mask = None
+
     def forward(self, inp):
-        return np.maximum(inp, 0, inp)
+        # the activation is done in place, so keep which units were active for backward
+        self.mask = _workspace(self.mask, len(inp), inp.shape[1], bool)
+        np.greater(inp, 0, out=self.mask[:len(inp)])
+        return np.maximum(inp, 0, out=inp)
 
-    def backward(self, inp, lr):
-        return (inp > 0) * 1.0
+    def infer(self, inp):
+        return np.maximum(inp, 0, out=inp)
+
+    def backward(self, grad):
+        return np.multiply(grad, self.mask[:len(grad)], out=grad)
 
 
 class Dense(Layer):
@@ -19,14 +35,43 @@ class Dense(Layer):
         self.bias = np.random.randn(1, out_size) / scale_factor
         self.inp = None
 
+        self.out = self.inp_err = None
+        self.row = self.bias_row = None
+
+    def cast(self, dtype):
+        super().cast(dtype)
+        self.row = np.empty(self.weights.shape[1], dtype=dtype)
+        self.bias_row = self.bias[0]
+
+    def swap(self, weights, bias):
+        old = super().swap(weights, bias)
+        self.bias_row = self.bias[0]
+        return old
+
     def forward(self, inp):
         self.inp = inp
-        return np.dot(inp, self.weights) + self.bias
+        self.out = _workspace(self.out, len(inp), self.weights.shape[1], self.weights.dtype)
+
+        out = self.out[:len(inp)]
+        np.dot(inp, self.weights, out=out)
+        out += self.bias
+        return out
 
-    def backward(self, grad_out, lr):
-        inp_err = np.dot(grad_out, self.weights.T)
+    def infer(self, inp):
+        # a single sample, nothing is kept for backward
+        np.dot(inp, self.weights, out=self.row)
+        return np.add(self.row, self.bias_row, out=self.row)
 
-        self.bias = self.bias - lr * grad_out.mean(axis=0)
-        self.weights = self.weights - lr * np.dot(self.inp.T, grad_out)
+    def backward(self, grad_out):
+        self.inp_err = _workspace(self.inp_err, len(grad_out), self.weights.shape[0], self.weights.dtype)
 
+        inp_err = self.inp_err[:len(grad_out)]
+        np.dot(grad_out, self.weights.T, out=inp_err)
+
+        self.gradients(self.inp, grad_out)
         return inp_err
+
+    def gradients(self, inp, grad_out):
+        # the loss gradient is already averaged over the batch, so both parameters take the sum over it
+        np.add.reduce(grad_out, axis=0, keepdims=True, out=self.grad_b)
+        np.dot(inp.T, grad_out, out=self.grad_w)
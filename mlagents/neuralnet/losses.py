@@ -2,10 +2,15 @@ import numpy as np
 
 
 class MSE:
+    # weights optionally scale the error of every sample (row)
     @staticmethod
-    def calc_loss(true, predicted):
-        return np.mean((true - predicted) ** 2)
+    def calc_loss(true, predicted, weights=None):
+        if weights is None:
+            return np.mean((true - predicted) ** 2)
+        return np.mean(weights[:, np.newaxis] * (true - predicted) ** 2)
 
     @staticmethod
-    def gradient(true, predicted):
-        return 2 * (predicted - true) / predicted.size
+    def gradient(true, predicted, weights=None):
+        if weights is None:
+            return 2 * (predicted - true) / predicted.size
+        return 2 * weights[:, np.newaxis] * (predicted - true) / predicted.size
@@ -0,0 +1,157 @@
+import numpy as np
+from abc import abstractmethod, ABCMeta
+
+
+class Optimizer(metaclass=ABCMeta):
+    # per parameter buffers listed in slots are part of the saved state, scratch is not
+    name = None
+    slots = ()
+
+    def __init__(self, lr=0.01, clip_norm=None, clip_value=None):
+        self.lr = lr
+        self.clip_norm = clip_norm
+        self.clip_value = clip_value
+
+        self.t = 0
+        self.state = {slot: [] for slot in self.slots}
+        self.scratch = []
+
+    def bind(self, params):
+        # zeroed buffers shaped like every parameter, existing ones are kept as long as they still fit
+        shapes = [(param.shape, param.dtype) for param, _ in params]
+        if [(buffer.shape, buffer.dtype) for buffer in self.scratch] == shapes:
+            return
+
+        self.t = 0
+        self.state = {slot: [np.zeros_like(param) for param, _ in params] for slot in self.slots}
+        self.scratch = [np.empty_like(param) for param, _ in params]
+
+    def reset(self):
+        self.t = 0
+        for buffers in self.state.values():
+            for buffer in buffers:
+                buffer.fill(0)
+
+    def clip(self, grads):
+        if self.clip_value is not None:
+            for grad in grads:
+                np.clip(grad, -self.clip_value, self.clip_value, out=grad)
+
+        # rescale all gradients together if their global norm is too large
+        if self.clip_norm is not None:
+            norm = np.sqrt(sum(float(np.vdot(grad, grad)) for grad in grads))
+            if norm > self.clip_norm:
+                for grad in grads:
+                    grad *= self.clip_norm / norm
+
+    def step(self, params):
+        self.clip([grad for _, grad in params])
+        self.t += 1
+
+        for i, (param, grad) in enumerate(params):
+            self.update(i, param, grad)
+
+    @abstractmethod
+    def update(self, i, param, grad):
+        raise NotImplementedError
+
+    def get_state(self):
+        return {
+            'name': self.name,
+            't': self.t,
+            'slots': {slot: [buffer.copy() for buffer in buffers] for slot, buffers in self.state.items()}
+        }
+
+    def set_state(self, state):
+        # state of another optimizer or other shapes is ignored, this one then starts from scratch
+        if state is None or state['name'] != self.name:
+            return self.reset()
+
+        for slot, buffers in self.state.items():
+            saved = state['slots'].get(slot, [])
+            if [arr.shape for arr in saved] != [buffer.shape for buffer in buffers]:
+                return self.reset()
+
+        for slot, buffers in self.state.items():
+            for buffer, arr in zip(buffers, state['slots'][slot]):
+                np.copyto(buffer, arr)
+        self.t = int(state['t'])
+
+
+class SGD(Optimizer):
+    name = 'sgd'
+
+    def __init__(self, lr=0.01, momentum=0.0, clip_norm=None, clip_value=None):
+        self.momentum = momentum
+        self.slots = ('velocity',) if momentum else ()
+        super().__init__(lr, clip_norm, clip_value)
+
+    def update(self, i, param, grad):
+        step = self.scratch[i]
+
+        if self.momentum:
+            velocity = self.state['velocity'][i]
+            velocity *= self.momentum
+            velocity += grad
+            grad = velocity
+
+        np.multiply(grad, self.lr, out=step)
+        param -= step
+
+
+class RMSProp(Optimizer):
+    name = 'rmsprop'
+    slots = ('square_avg',)
+
+    def __init__(self, lr=0.001, rho=0.9, eps=1e-7, clip_norm=None, clip_value=None):
+        super().__init__(lr, clip_norm, clip_value)
+        self.rho = rho
+        self.eps = eps
+
+    def update(self, i, param, grad):
+        square_avg = self.state['square_avg'][i]
+        step = self.scratch[i]
+
+        square_avg *= self.rho
+        np.multiply(grad, grad, out=step)
+        step *= 1 - self.rho
+        square_avg += step
+
+        np.sqrt(square_avg, out=step)
+        step += self.eps
+        np.divide(grad, step, out=step)
+        step *= self.lr
+        param -= step
+
+
+class Adam(Optimizer):
+    name = 'adam'
+    slots = ('m', 'v')
+
+    def __init__(self, lr=0.001, beta1=0.9, beta2=0.999, eps=1e-7, clip_norm=None, clip_value=None):
+        super().__init__(lr, clip_norm, clip_value)
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.eps = eps
+
+    def update(self, i, param, grad):
+        m, v = self.state['m'][i], self.state['v'][i]
+        step = self.scratch[i]
+
+        m *= self.beta1
+        np.multiply(grad, 1 - self.beta1, out=step)
+        m += step
+
+        v *= self.beta2
+        np.multiply(grad, grad, out=step)
+        step *= 1 - self.beta2
+        v += step
+
+        # bias correction of both moments folded into the step size
+        lr = self.lr * (1 - self.beta2 ** self.t) ** 0.5 / (1 - self.beta1 ** self.t)
+
+        np.sqrt(v, out=step)
+        step += self.eps
+        np.divide(m, step, out=step)
+        step *= lr
+        param -= step
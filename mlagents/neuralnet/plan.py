@@ -0,0 +1,79 @@
+import numpy as np
+
+from mlagents.neuralnet.layers import Dense, ReLU, _workspace
+
+
+class FusedDense:
+    # a Dense layer and the ReLU following it (if any) run as one kernel on preallocated buffers
+    def __init__(self, dense: Dense, relu: bool, needs_inp_err: bool, max_batch: int):
+        self.dense = dense
+        self.relu = relu
+        self.needs_inp_err = needs_inp_err
+
+        inp_size, out_size = dense.weights.shape
+        dtype = dense.weights.dtype
+
+        self.inp = None
+        self.out = _workspace(None, max_batch, out_size, dtype)
+        self.mask = _workspace(None, max_batch, out_size, bool) if relu else None
+        self.inp_err = _workspace(None, max_batch, inp_size, dtype) if needs_inp_err else None
+
+    def forward(self, inp):
+        n = len(inp)
+        dense = self.dense
+        self.inp = inp
+
+        self.out = _workspace(self.out, n, dense.weights.shape[1], dense.weights.dtype)
+        out = self.out[:n]
+        np.dot(inp, dense.weights, out=out)
+        out += dense.bias
+
+        if self.relu:
+            self.mask = _workspace(self.mask, n, dense.weights.shape[1], bool)
+            np.greater(out, 0, out=self.mask[:n])
+            np.maximum(out, 0, out=out)
+
+        return out
+
+    def infer(self, inp):
+        out = self.dense.infer(inp)
+        if self.relu:
+            np.maximum(out, 0, out=out)
+        return out
+
+    def backward(self, grad_out):
+        n = len(grad_out)
+        dense = self.dense
+
+        if self.relu:
+            np.multiply(grad_out, self.mask[:n], out=grad_out)
+
+        # the first kernel of the plan has nothing to pass the input gradient to
+        inp_err = None
+        if self.needs_inp_err:
+            self.inp_err = _workspace(self.inp_err, n, dense.weights.shape[0], dense.weights.dtype)
+            inp_err = self.inp_err[:n]
+            np.dot(grad_out, dense.weights.T, out=inp_err)
+
+        dense.gradients(self.inp, grad_out)
+        return inp_err
+
+
+def build_plan(layers, max_batch=1):
+    # flat list of kernels, Dense + ReLU pairs are fused and anything else runs as the layer itself
+    plan = []
+
+    i = 0
+    while i < len(layers):
+        layer = layers[i]
+
+        if isinstance(layer, Dense):
+            relu = i + 1 < len(layers) and isinstance(layers[i + 1], ReLU)
+            plan.append(FusedDense(layer, relu, len(plan) > 0, max_batch))
+            i += 2 if relu else 1
+
+        else:
+            plan.append(layer)
+            i += 1
+
+    return plan
@@ -0,0 +1,120 @@
+import sys
+import json
+import struct
+import pickle
+import numpy as np
+
+# binary model format, little endian:
+#   magic (4 bytes) | version (uint32) | header size (uint32) | json header | padding | aligned array blocks
+# the header lists every array as {"dtype", "shape", "offset"} in snapshot order: weights of every layer, then biases,
+# then (version 2) the buffers of every optimizer slot, one per parameter, described by the "optimizer" entry
+
+MAGIC = b'NPNN'
+VERSION = 2
+ALIGNMENT = 64
+
+_PREFIX = struct.Struct('<4sII')
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def is_binary(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def dump_binary(snapshot, f):
+    weights, biases = snapshot[:2]
+    arrays = weights + biases
+    header = {'version': VERSION, 'layers': len(weights)}
+
+    if len(snapshot) > 2 and snapshot[2] is not None:
+        optimizer = snapshot[2]
+        header['optimizer'] = {
+            'name': optimizer['name'],
+            't': optimizer['t'],
+            'slots': {slot: len(buffers) for slot, buffers in optimizer['slots'].items()}
+        }
+        for buffers in optimizer['slots'].values():
+            arrays = arrays + buffers
+
+    arrays = [np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder('<')) for arr in arrays]
+    entries = [{'dtype': arr.dtype.str, 'shape': list(arr.shape), 'offset': 0} for arr in arrays]
+    header['arrays'] = entries
+
+    # offsets depend on the header size, which depends on the offsets, so fix them with a generous header
+    size = len(json.dumps(header).encode()) + 16 * len(arrays)
+    offset = _align(_PREFIX.size + size)
+    for entry, arr in zip(entries, arrays):
+        entry['offset'] = offset
+        offset = _align(offset + arr.nbytes)
+
+    # the array offsets were computed for a header of this size, a longer one would shift every array
+    raw = json.dumps(header).encode()
+    if len(raw) > size:
+        raise ValueError(f'model header takes {len(raw)} bytes, only {size} were reserved for it')
+    raw = raw.ljust(size)
+    f.write(_PREFIX.pack(MAGIC, VERSION, size))
+    f.write(raw)
+
+    position = _PREFIX.size + size
+    for entry, arr in zip(entries, arrays):
+        f.write(b'\0' * (entry['offset'] - position))
+        f.write(arr.tobytes())
+        position = entry['offset'] + arr.nbytes
+
+
+def load_binary(filename, mmap=False):
+    # one read-only mapping (shared through the page cache) or one read, the arrays are views into it
+    if mmap:
+        buffer = np.memmap(filename, dtype=np.uint8, mode='r')
+    else:
+        with open(filename, 'rb') as f:
+            buffer = bytearray(f.read())
+
+    magic, version, size = _PREFIX.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError(f'{filename} is not a binary model file')
+    if version > VERSION:
+        raise ValueError(f'{filename} has format version {version}, only {VERSION} is supported')
+
+    header = json.loads(bytes(buffer[_PREFIX.size: _PREFIX.size + size]))
+
+    arrays = [
+        np.ndarray(tuple(entry['shape']), dtype=np.dtype(entry['dtype']), buffer=buffer, offset=entry['offset'])
+        for entry in header['arrays']
+    ]
+
+    n = header['layers']
+    snapshot = [arrays[:n], arrays[n: 2 * n]]
+
+    if 'optimizer' in header:
+        optimizer = header['optimizer']
+        slots = {}
+        offset = 2 * n
+        for slot, count in optimizer['slots'].items():
+            slots[slot] = arrays[offset: offset + count]
+            offset += count
+        snapshot.append({'name': optimizer['name'], 't': optimizer['t'], 'slots': slots})
+
+    return snapshot
+
+
+def load_snapshot(filename, mmap=False):
+    if is_binary(filename):
+        return load_binary(filename, mmap)
+
+    with open(filename, 'rb') as f:
+        return pickle.load(f)
+
+
+def convert(src, dst):
+    with open(dst, 'wb') as f:
+        dump_binary(load_snapshot(src), f)
+
+
+if __name__ == '__main__':
+    # python -m mlagents.neuralnet.serialization assets/snake_agent.pkl assets/snake_agent.npnn
+    convert(sys.argv[1], sys.argv[2])
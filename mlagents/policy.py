@@ -0,0 +1,50 @@
+import numpy as np
+
+from mlagents.neuralnet.api import NeuralNet
+
+
+class PolicyTable:
+    # memoized greedy policy over every binary state, refreshed whenever the network's weights change
+    def __init__(self, net: NeuralNet, n_features=11, n_actions=3, eager=False):
+        self.net = net
+        self.eager = eager
+
+        # feature i is bit i of a state's key
+        self.bits = 1 << np.arange(n_features)
+        self.states = ((np.arange(1 << n_features)[:, np.newaxis] >> np.arange(n_features)) & 1).astype(np.uint8)
+
+        self.q_table = np.zeros((1 << n_features, n_actions), dtype=net.dtype)
+        self.actions = np.full(1 << n_features, -1, dtype=np.int8)
+        self.version = None
+
+    def key(self, state) -> int:
+        return int(np.dot(state, self.bits))
+
+    def precompute(self):
+        # every state in one batched forward pass
+        self.q_table[:] = self.net.predict(self.states)
+        self.actions[:] = self.q_table.argmax(axis=1)
+        self.version = self.net.version
+
+    def _refresh(self):
+        if self.eager:
+            self.precompute()
+        else:
+            self.actions.fill(-1)
+            self.version = self.net.version
+
+    def q_values(self, state) -> np.ndarray:
+        self.action(state)
+        return self.q_table[self.key(state)]
+
+    def action(self, state) -> int:
+        if self.version != self.net.version:
+            self._refresh()
+
+        key = self.key(state)
+        action = self.actions[key]
+        if action < 0:
+            self.q_table[key] = self.net.infer_row(state)
+            action = self.actions[key] = self.q_table[key].argmax()
+
+        return int(action)
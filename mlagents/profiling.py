@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import time
+import threading
+import numpy as np
+
+
+def rss():
+    # resident set size in bytes, the peak one where /proc is not available, None if neither is
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _Ring:
+    # the last `size` durations of a phase, added to from any thread
+    def __init__(self, size):
+        self.values = np.zeros(size, dtype=np.float64)
+        self.cursor = 0
+        self.count = 0
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def add(self, value):
+        with self.lock:
+            self.values[self.cursor] = value
+            self.cursor = (self.cursor + 1) % len(self.values)
+            self.count = min(self.count + 1, len(self.values))
+            self.total += 1
+
+    def summary(self):
+        values = self.values[:self.count] * 1e3
+        p50, p90, p99 = np.percentile(values, (50, 90, 99))
+        return {
+            'calls': self.total, 'mean_ms': float(values.mean()),
+            'p50_ms': float(p50), 'p90_ms': float(p90), 'p99_ms': float(p99)
+        }
+
+
+class _Timer:
+    # one per timed block, so threads timing the same phase never share a start time
+    __slots__ = ('ring', 'start')
+
+    def __init__(self, ring):
+        self.ring = ring
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.ring.add(time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL = _NullTimer()
+
+
+class Profiler:
+    # named phase timings, counters and gauges, reported every report_every games
+    # while disabled timer() hands out one shared no-op context manager and the other calls return right away
+    def __init__(self, enabled=False, report_every=10, window=1000, filename='profile.jsonl'):
+        self.enabled = enabled
+        self.report_every = report_every
+        self.window = window
+        self.filename = filename
+
+        self.timers = {}
+        self.counters = {}
+        self.gauges = {}
+
+        self.games = 0
+        self.steps = 0
+        self.last_steps = 0
+        self.last_report = time.perf_counter()
+        self._file = None
+
+    @staticmethod
+    def from_env():
+        # SNAKE_PROFILE=<games between reports> turns profiling on, SNAKE_PROFILE_FILE changes the output file
+        every = os.environ.get('SNAKE_PROFILE')
+        return Profiler(bool(every), int(every or 10), filename=os.environ.get('SNAKE_PROFILE_FILE', 'profile.jsonl'))
+
+    def enable(self, report_every=None, filename=None):
+        self.enabled = True
+        self.report_every = report_every or self.report_every
+        self.filename = filename or self.filename
+        self.last_report = time.perf_counter()
+
+    def timer(self, name):
+        if not self.enabled:
+            return _NULL
+
+        ring = self.timers.get(name)
+        if ring is None:
+            ring = self.timers.setdefault(name, _Ring(self.window))
+        return _Timer(ring)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        if self.enabled:
+            self.gauges[name] = value
+
+    def step(self, n=1):
+        self.steps += n
+
+    def game_over(self, n=1):
+        if not self.enabled:
+            return
+
+        self.games += n
+        if self.games % self.report_every < n:
+            self.report()
+
+    def report(self):
+        now = time.perf_counter()
+        report = {
+            'time': time.time(),
+            'games': self.games,
+            'steps': self.steps,
+            'steps_per_sec': (self.steps - self.last_steps) / (now - self.last_report),
+            'rss_bytes': rss(),
+            'phases': {name: ring.summary() for name, ring in list(self.timers.items())},
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges)
+        }
+        self.last_report, self.last_steps = now, self.steps
+
+        print(f'Profile at game {self.games}: {report["steps_per_sec"]:.0f} steps/s, rss {(report["rss_bytes"] or 0) >> 20} MB')
+        for name, phase in sorted(report['phases'].items(), key=lambda item: -item[1]['mean_ms'] * item[1]['calls']):
+            print(
+                f'  {name:<24} {phase["calls"]:>9} calls {phase["mean_ms"]:>9.3f} mean {phase["p50_ms"]:>9.3f} p50 '
+                f'{phase["p99_ms"]:>9.3f} p99 ms'
+            )
+        for name, value in {**report['counters'], **report['gauges']}.items():
+            print(f'  {name:<24} {value}')
+
+        if self.filename:
+            if self._file is None:
+                self._file = open(self.filename, 'a')
+            self._file.write(json.dumps(report) + '\n')
+            self._file.flush()
+
+        return report
+
+
+# shared by the training and play loops, the model and the game screens
+profiler = Profiler.from_env()
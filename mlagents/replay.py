@@ -0,0 +1,156 @@
+import numpy as np
+
+
+class ReplayMemory:
+    def __init__(self, capacity, state_size=11, seed=None):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+
+        # states are 0/1 features, actions are indices into the 3 moves
+        self.states = np.zeros((capacity, state_size), dtype=np.uint8)
+        self.next_states = np.zeros((capacity, state_size), dtype=np.uint8)
+        self.actions = np.zeros(capacity, dtype=np.uint8)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=bool)
+
+        self.cursor = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, state, action, reward, next_state, done):
+        i = self.cursor
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+
+        self.cursor = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        idx = (self.cursor + np.arange(len(actions))) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+
+        self.cursor = (self.cursor + len(actions)) % self.capacity
+        self.size = min(self.size + len(actions), self.capacity)
+
+    def sample_indices(self, batch_size):
+        # the whole memory while it is smaller than a batch, uniform with replacement afterwards
+        if self.size > batch_size:
+            return self.rng.integers(0, self.size, batch_size)
+        return np.arange(self.size)
+
+    def sample(self, batch_size):
+        idx = self.sample_indices(batch_size)
+        return (
+            self.states.take(idx, axis=0), self.actions[idx], self.rewards[idx],
+            self.next_states.take(idx, axis=0), self.dones[idx]
+        )
+
+
+class SumTree:
+    def __init__(self, capacity):
+        # array-backed binary tree, leaves start at self.leaves and node i has children 2i and 2i + 1
+        self.leaves = 1 << max(capacity - 1, 1).bit_length()
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    @property
+    def total(self):
+        return self.tree[1]
+
+    def set(self, index, priority):
+        i = index + self.leaves
+        self.tree[i] = priority
+
+        i //= 2
+        while i > 0:
+            self.tree[i] = self.tree[2 * i] + self.tree[2 * i + 1]
+            i //= 2
+
+    def update(self, indices, priorities):
+        if len(indices) == 0:
+            return
+
+        nodes = indices + self.leaves
+        self.tree[nodes] = priorities
+
+        # duplicate parents are all written with the same sum, so no need for np.unique
+        nodes //= 2
+        while nodes[0] > 0:
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+            nodes //= 2
+
+    def find(self, values):
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = values.copy()
+
+        while nodes[0] < self.leaves:
+            left = self.tree[2 * nodes]
+            right = values > left
+            values -= left * right
+            nodes = 2 * nodes + right
+
+        return nodes - self.leaves
+
+    def get(self, indices):
+        return self.tree[indices + self.leaves]
+
+
+class PrioritizedReplayMemory(ReplayMemory):
+    def __init__(self, capacity, state_size=11, seed=None, alpha=0.6, beta=0.4, beta_increment=0.001, eps=0.01):
+        super().__init__(capacity, state_size, seed)
+        self.tree = SumTree(capacity)
+
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.eps = eps
+
+        # new transitions get the highest priority seen so far, so each one is replayed at least once
+        self.max_priority = 1.0
+
+    def append(self, state, action, reward, next_state, done):
+        self.tree.set(self.cursor, self.max_priority)
+        super().append(state, action, reward, next_state, done)
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        idx = (self.cursor + np.arange(len(actions))) % self.capacity
+        self.tree.update(idx, self.max_priority)
+        super().extend(states, actions, rewards, next_states, dones)
+
+    def sample_indices(self, batch_size):
+        # stratified: one draw from each of batch_size equal slices of the total priority
+        if self.size > batch_size:
+            segment = self.tree.total / batch_size
+            values = (np.arange(batch_size) + self.rng.random(batch_size)) * segment
+            return np.minimum(self.tree.find(values), self.size - 1)
+        return np.arange(self.size)
+
+    def importance_weights(self, idx):
+        # normalized so the largest one is 1, every call anneals beta towards 1
+        probs = self.tree.get(idx) / self.tree.total
+        weights = (self.size * probs) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return weights
+
+    def sample(self, batch_size):
+        idx = self.sample_indices(batch_size)
+        weights = self.importance_weights(idx)
+
+        return (
+            self.states.take(idx, axis=0), self.actions[idx], self.rewards[idx],
+            self.next_states.take(idx, axis=0), self.dones[idx], idx, weights
+        )
+
+    def update_priorities(self, idx, td_errors):
+        priorities = (np.abs(td_errors) + self.eps) ** self.alpha
+        self.tree.update(idx, priorities)
+        self.max_priority = max(self.max_priority, priorities.max())
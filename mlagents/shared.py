@@ -0,0 +1,180 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+from mlagents.neuralnet.api import NeuralNet
+from mlagents.replay import ReplayMemory
+
+
+def _aligned(offset, alignment=64):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+class SharedArrays:
+    # named arrays laid out in one shared memory block, created by one process and attached by name in others
+    def __init__(self, spec, name=None):
+        offsets = {}
+        size = 0
+        for key, shape, dtype in spec:
+            offsets[key] = size
+            size = _aligned(size + int(np.prod(shape)) * np.dtype(dtype).itemsize)
+
+        # only the creator unlinks the block, the other processes just close their mapping
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=max(size, 1))
+
+        self.arrays = {
+            key: np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offsets[key])
+            for key, shape, dtype in spec
+        }
+        if self.owner:
+            for arr in self.arrays.values():
+                arr.fill(0)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def close(self):
+        # views into the block have to be gone before it can be closed
+        self.arrays = {}
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class SharedReplayMemory(ReplayMemory):
+    # every writer owns a partition of capacity // n_partitions rows, so appends need no lock
+    # every row has a sequence counter like SharedWeights (odd while the row is written), sample() copies the
+    # rows out and drops the ones a writer touched meanwhile, so a batch never mixes fields of two transitions
+    def __init__(self, capacity, n_partitions, state_size=11, seed=None, name=None, partition=None):
+        self.capacity = capacity - capacity % n_partitions
+        self.n_partitions = n_partitions
+        self.part_size = self.capacity // n_partitions
+        self.partition = partition
+        self.rng = np.random.default_rng(seed)
+
+        self.block = SharedArrays([
+            ('cursors', (n_partitions,), np.int64),
+            ('sizes', (n_partitions,), np.int64),
+            ('sequences', (self.capacity,), np.int64),
+            ('states', (self.capacity, state_size), np.uint8),
+            ('next_states', (self.capacity, state_size), np.uint8),
+            ('actions', (self.capacity,), np.uint8),
+            ('rewards', (self.capacity,), np.float32),
+            ('dones', (self.capacity,), bool)
+        ], name)
+
+        self.cursors, self.sizes, self.sequences = self.block['cursors'], self.block['sizes'], self.block['sequences']
+        self.states, self.next_states = self.block['states'], self.block['next_states']
+        self.actions, self.rewards, self.dones = self.block['actions'], self.block['rewards'], self.block['dones']
+
+    @property
+    def name(self):
+        return self.block.name
+
+    @property
+    def size(self):
+        return int(self.sizes.sum())
+
+    def append(self, state, action, reward, next_state, done):
+        p = self.partition
+        i = p * self.part_size + self.cursors[p]
+
+        self.sequences[i] += 1
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.sequences[i] += 1
+
+        # the size grows only after the row is complete
+        self.cursors[p] = (self.cursors[p] + 1) % self.part_size
+        self.sizes[p] = min(self.sizes[p] + 1, self.part_size)
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        for transition in zip(states, actions, rewards, next_states, dones):
+            self.append(*transition)
+
+    def sample_indices(self, batch_size):
+        # uniform over the filled rows of all partitions, which are the first sizes[p] rows of every partition
+        sizes = self.sizes.copy()
+        filled = np.cumsum(sizes)
+
+        if filled[-1] > batch_size:
+            rows = self.rng.integers(0, filled[-1], batch_size)
+        else:
+            rows = np.arange(filled[-1])
+
+        parts = np.searchsorted(filled, rows, side='right')
+        return parts * self.part_size + rows - (filled[parts] - sizes[parts])
+
+    def sample(self, batch_size):
+        # the rows are read in between two reads of their sequence counters, torn ones are left out of the batch
+        idx = self.sample_indices(batch_size)
+        before = self.sequences[idx]
+
+        batch = (
+            self.states.take(idx, axis=0), self.actions[idx], self.rewards[idx],
+            self.next_states.take(idx, axis=0), self.dones[idx]
+        )
+
+        valid = (before == self.sequences[idx]) & (before % 2 == 0)
+        if valid.all():
+            return batch
+        return tuple(column[valid] for column in batch)
+
+    def close(self):
+        self.cursors = self.sizes = self.sequences = None
+        self.states = self.next_states = self.actions = self.rewards = self.dones = None
+        self.block.close()
+
+
+class SharedWeights:
+    # parameters of a network published by one process to many, guarded by a sequence counter
+    # (odd while a write is in progress) so readers never keep a half written set
+    def __init__(self, net: NeuralNet, name=None):
+        params = [param for param, _ in net.params()]
+        spec = [('sequence', (1,), np.int64)]
+        spec += [(f'param{i}', param.shape, param.dtype) for i, param in enumerate(params)]
+
+        self.block = SharedArrays(spec, name)
+        self.sequence = self.block['sequence']
+        self.params = [self.block[f'param{i}'] for i in range(len(params))]
+
+        # reader side copy, swapped into the network only once it is known to be consistent
+        self.staging = [np.empty_like(param) for param in params]
+        self.seen = 0
+
+    @property
+    def name(self):
+        return self.block.name
+
+    def publish(self, net: NeuralNet):
+        self.sequence[0] += 1
+        for dst, (param, _) in zip(self.params, net.params()):
+            np.copyto(dst, param)
+        self.sequence[0] += 1
+
+    def pull(self, net: NeuralNet) -> bool:
+        sequence = int(self.sequence[0])
+        if sequence == self.seen or sequence % 2:
+            return False
+
+        for dst, src in zip(self.staging, self.params):
+            np.copyto(dst, src)
+        if int(self.sequence[0]) != sequence:
+            return False
+
+        for (param, _), src in zip(net.params(), self.staging):
+            np.copyto(param, src)
+        self.seen = sequence
+        net.version += 1
+        return True
+
+    def close(self):
+        self.sequence = self.params = None
+        self.block.close()